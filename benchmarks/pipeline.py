@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# Ensure src modules import correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+import generate_simulation as sim
+from src.detection import TrafficDetector
+from src.metrics import Metrics
+from src.roi import DEFAULT_ROI
+from src.signal_logic import decide_direction
+
+STAGES = ["resize", "mog2", "threshold", "morphology", "contours", "classification", "signal"]
+
+
+# ------------------------------------------------
+# WORKLOAD: seeded frames from the simulator's Vehicle model
+# ------------------------------------------------
+def synthetic_frames(n_frames, density, resolution, seed):
+    """
+    Yield deterministic frames of the simulated junction.
+    density: spawn probability per frame on each axis (the simulator uses 0.15-0.3).
+    """
+    random.seed(seed)
+    vehicles = []
+    signal = "Horizontal"
+    types = ["car", "auto", "bike", "bus", "truck"]
+
+    for i in range(n_frames):
+        frame = np.empty((sim.HEIGHT, sim.WIDTH, 3), dtype=np.uint8)
+        frame[:] = sim.COLOR_GRASS
+        cv2.rectangle(frame, (0, sim.H_ROAD_Y1), (sim.WIDTH, sim.H_ROAD_Y2), sim.COLOR_ROAD, -1)
+        cv2.rectangle(frame, (sim.V_ROAD_X1, 0), (sim.V_ROAD_X2, sim.HEIGHT), sim.COLOR_ROAD, -1)
+
+        if random.random() < density:
+            d = random.choice(["right", "left"])
+            offset = random.randint(10, 80)
+            if d == "right": x, y = -100, sim.H_ROAD_Y2 - offset - 20
+            else: x, y = sim.WIDTH + 50, sim.H_ROAD_Y1 + offset
+            vehicles.append(sim.Vehicle(random.choice(types), d, x, y))
+
+        if random.random() < density:
+            d = random.choice(["down", "up"])
+            offset = random.randint(10, 80)
+            if d == "down": x, y = sim.V_ROAD_X1 + offset, -100
+            else: x, y = sim.V_ROAD_X2 - offset - 20, sim.HEIGHT + 50
+            vehicles.append(sim.Vehicle(random.choice(types), d, x, y))
+
+        # Alternate green every 3 seconds so queues build up and release
+        if i % (sim.FPS * 3) == 0:
+            signal = "Vertical" if signal == "Horizontal" else "Horizontal"
+
+        for v in vehicles:
+            v.move(signal, vehicles)
+            sim.draw_vehicle_detailed(frame, v)
+        vehicles = [v for v in vehicles if -150 < v.x < sim.WIDTH + 150 and -150 < v.y < sim.HEIGHT + 150]
+
+        if resolution != (sim.WIDTH, sim.HEIGHT):
+            frame = cv2.resize(frame, resolution)
+        yield frame
+
+
+# ------------------------------------------------
+# STAGE TIMING: TrafficDetector's own stage timers, every sample kept
+# ------------------------------------------------
+class StageRecorder(Metrics):
+    """Metrics whose stage timers keep raw samples, so percentiles can be taken."""
+
+    def __init__(self):
+        super().__init__()
+        self.samples = {stage: [] for stage in STAGES}
+
+    def observe_stage(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+
+def run_stages(detector, frame, recorder):
+    """One frame through the public stage methods; the detector times its own stages."""
+    detector.prepare(frame)
+    detector.subtract()
+    detections = detector.extract()
+
+    t0 = recorder.now()
+    w, h = detector.output_size
+    count_h, count_v = DEFAULT_ROI.count_lanes(detections, w, h)
+    decide_direction(count_h, count_v)
+    recorder.observe_stage("signal", recorder.now() - t0)
+    return len(detections)
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def run_benchmark(frames=300, density=0.2, resolution=(1280, 720), process_size=(960, 540),
+                  seed=42, warmup=30, roi=False):
+    detector = TrafficDetector(
+        process_size=process_size, output_size=process_size, roi=DEFAULT_ROI if roi else None
+    )
+    recorder = StageRecorder()
+    totals = []
+    detections = 0
+
+    tracemalloc.start()
+    for i, frame in enumerate(synthetic_frames(warmup + frames, density, resolution, seed)):
+        if i < warmup:
+            # Let MOG2 learn the background before measuring
+            detector.detect_array(frame, annotate=False)
+            continue
+        detector.metrics = recorder
+        start = time.perf_counter()
+        detections += run_stages(detector, frame, recorder)
+        totals.append(time.perf_counter() - start)
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_seconds = float(np.sum(totals))
+    return {
+        "config": {
+            "frames": frames, "density": density, "seed": seed, "warmup": warmup,
+            "resolution": list(resolution), "process_size": list(process_size), "roi": roi,
+        },
+        "stages": {stage: summarize(samples) for stage, samples in recorder.samples.items()},
+        "total": summarize(totals),
+        "throughput_fps": frames / total_seconds if total_seconds > 0 else 0.0,
+        "detections_per_frame": detections / float(frames) if frames else 0.0,
+        "peak_traced_mb": peak_traced / 1e6,
+        # ru_maxrss is kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+    }
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency benchmark for the detection pipeline.")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--density", type=float, default=0.2, help="Spawn probability per frame per axis")
+    parser.add_argument("--resolution", type=parse_size, default=(1280, 720), help="Input size, e.g. 1920x1080")
+    parser.add_argument("--process-size", type=parse_size, default=(960, 540))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--roi", action="store_true", help="Detect on the default road ROI tiles only")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.frames, args.density, args.resolution, args.process_size, args.seed, args.warmup, args.roi
+    )
+    text = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"📄 Report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Ensure src modules import correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.detection import REFERENCE_SIZE, TrafficDetector
+
+VIDEO_PATH = os.path.join(BASE_DIR, "videos", "traffic.mp4")
+SCALES = [(960, 540), (480, 270), (320, 180)]
+
+
+def load_frames(path, max_frames=None):
+    """Decode up front so the timings below measure detection only."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"❌ Could not open video source: {path}")
+    frames = []
+    while max_frames is None or len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run_scale(frames, size):
+    detector = TrafficDetector(process_size=size, output_size=REFERENCE_SIZE)
+    counts = np.zeros(len(frames), dtype=np.int32)
+
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        objects, _ = detector.detect(frame, annotate=False)
+        counts[i] = len(objects)
+    seconds = time.perf_counter() - start
+
+    return counts, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare detection counts and fps across processing scales.")
+    parser.add_argument("--video", default=VIDEO_PATH)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.max_frames)
+    results = []
+    reference = None
+
+    for size in SCALES:
+        counts, seconds = run_scale(frames, size)
+        if reference is None:
+            reference = counts
+        results.append({
+            "process_size": f"{size[0]}x{size[1]}",
+            "frames": len(frames),
+            "detections": int(counts.sum()),
+            "mean_per_frame": float(counts.mean()) if len(frames) else 0.0,
+            # Average per-frame count difference against the full-size run
+            "mean_abs_diff": float(np.abs(counts - reference).mean()) if len(frames) else 0.0,
+            "fps": len(frames) / seconds if seconds > 0 else 0.0,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'scale':>10} {'frames':>7} {'dets':>7} {'dets/frame':>11} {'|diff|':>7} {'fps':>8}")
+    for r in results:
+        print(
+            f"{r['process_size']:>10} {r['frames']:>7} {r['detections']:>7} "
+            f"{r['mean_per_frame']:>11.2f} {r['mean_abs_diff']:>7.2f} {r['fps']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,27 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
-from src.detection import detect_traffic
-from src.signal_logic import decide_direction, congestion_level
-from src.voice_alerts import speak_text
+from src.cadence import AdaptiveDetector
+from src.detection import LABEL_CODES, TrafficDetector
+from src.detlog import DetectionLogWriter
+from src.events import DetectionEvents, EventBus, JsonlFileSink, SqliteSink, WebSocketSink
+from src.history import RollingAggregator
+from src.metrics import Metrics
+from src.pipeline import DetectionPipeline, FramePacer, source_fps
+from src.roi import DEFAULT_ROI
+from src.tracking import VehicleTracker
+from src.video_output import IncidentRecorder
+from src.signal_logic import CONTROLLERS, congestion_level, make_controller
+from src.voice_alerts import PRIORITY_EMERGENCY, get_service, speak_text
 
 # Paths
 VIDEO_PATH = os.path.join(BASE_DIR, "videos", "traffic.mp4")
 SIM_PATH = os.path.join(BASE_DIR, "videos", "simulation.mp4")
+LOG_PATH = os.path.join(BASE_DIR, "logs", "detections.stlog")
+INCIDENT_DIR = os.path.join(BASE_DIR, "logs", "incidents")
+EVENTS_JSONL = os.path.join(BASE_DIR, "logs", "events.jsonl")
+EVENTS_DB = os.path.join(BASE_DIR, "logs", "events.sqlite")
+HISTORY_DB = os.path.join(BASE_DIR, "logs", "history.sqlite")
 ICON_DIR = os.path.join(os.path.dirname(__file__), "icons")
 
 # UI Config
@@ -72,6 +86,64 @@ use_camera = st.sidebar.toggle("🎥 Use Laptop Camera")
 
 source_path = VIDEO_PATH if video_option == "Real Traffic Video" else SIM_PATH
 if use_camera: source_path = 0
+roi_only = st.sidebar.toggle("🛣️ Detect on road area only", value=True)
+pipelined = st.sidebar.toggle("⚡ Pipelined mode (threaded capture + detection)", value=True)
+adaptive = st.sidebar.toggle("⏱️ Adaptive detection cadence")
+metrics_on = st.sidebar.toggle("📈 Metrics endpoint (:9108/metrics)")
+record_log = st.sidebar.toggle("📝 Record detection log (logs/detections.stlog)")
+record_incidents = st.sidebar.toggle("🎬 Save ambulance clips (logs/incidents)")
+events_on = st.sidebar.toggle("📡 Event stream (logs/events.*, ws://localhost:8765)")
+history_on = st.sidebar.toggle("🗂️ Lane count history (logs/history.sqlite)")
+controller_name = st.sidebar.selectbox(
+    "🚦 Signal controller", list(CONTROLLERS), index=list(CONTROLLERS).index("hysteresis")
+)
+
+
+@st.cache_resource
+def get_event_bus(ws_port=8765):
+    """Event bus + local sinks, shared across reruns (the WebSocket port is bound once)."""
+    bus = EventBus()
+    bus.subscribe(JsonlFileSink(EVENTS_JSONL))
+    bus.subscribe(SqliteSink(EVENTS_DB))
+    bus.subscribe(WebSocketSink(port=ws_port))
+    return bus
+
+
+@st.cache_resource
+def get_history():
+    """Rolling second/minute/hour aggregates, shared across reruns."""
+    return RollingAggregator(HISTORY_DB)
+
+
+@st.cache_resource
+def get_metrics(port=9108):
+    """One registry + HTTP exporter per server process (survives Streamlit reruns)."""
+    metrics = Metrics()
+    metrics.serve(port)
+    return metrics
+
+
+def serial_results(cap, detector, live, metrics=None):
+    """Decode + detect in the UI thread, paced to the source fps (same fields as the pipelined results)."""
+    pacer = FramePacer(0 if live else source_fps(cap))
+    frame_index = 0
+    while True:
+        if metrics is not None:
+            t0 = metrics.now()
+        ret, frame = cap.read()
+        if not ret:
+            return
+        captured_at = time.monotonic()
+        if metrics is not None:
+            metrics.observe_stage("decode", metrics.now() - t0)
+        detections, img = detector.detect_array(frame)
+        yield frame_index, detections, img, captured_at
+        frame_index += 1
+        pacer.wait()
+
+
+# Start the alert worker now so it synthesises the fixed phrases before the first alert
+get_service()
 
 # State
 if 'last_signal' not in st.session_state: st.session_state.last_signal = "Horizontal"
@@ -92,6 +164,7 @@ if start_button:
             metric_h = st.empty()
         with m2:
             metric_v = st.empty()
+        metric_flow = st.empty()
             
         st.markdown("---")
         st.markdown("### 🧠 AI Decision Log")
@@ -101,39 +174,80 @@ if start_button:
         st.markdown("### 🚦 Signal Status")
         signal_status = st.empty()
 
-    cap = cv2.VideoCapture(source_path)
+        if history_on:
+            st.markdown("---")
+            st.markdown("### 🗂️ Lane History (last 10 min)")
+            history_chart = st.empty()
+
+    # Fresh background model per run; ROI shared between detection and counting
+    metrics = get_metrics() if metrics_on else None
+    detector = TrafficDetector(roi=DEFAULT_ROI if roi_only else None, metrics=metrics)
+    if adaptive:
+        detector = AdaptiveDetector(detector)
     
-    if not cap.isOpened():
-        st.error(f"❌ Could not open video source: {source_path}")
-        st.stop()
+    if pipelined:
+        # Capture and detection run on their own threads; the UI shows the newest result
+        pipeline = DetectionPipeline(source_path, detector, metrics=metrics)
+        if not pipeline.start():
+            st.error(f"❌ Could not open video source: {source_path}")
+            st.stop()
+        results = ((r.frame_index, r.detections, r.image, r.captured_at) for r in pipeline.results())
+        fps = pipeline.fps
+    else:
+        cap = cv2.VideoCapture(source_path)
+        if not cap.isOpened():
+            st.error(f"❌ Could not open video source: {source_path}")
+            st.stop()
+        results = serial_results(cap, detector, use_camera, metrics)
+        fps = source_fps(cap)
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            st.success("Simulation Complete")
-            break
-            
-        # Detection
-        objects, img = detect_traffic(frame)
+    tracker = None
+    controller = make_controller(controller_name)
+    det_log = DetectionLogWriter(LOG_PATH) if record_log else None
+    events = DetectionEvents(get_event_bus(), stream=str(source_path)) if events_on else None
+    # Annotated frames around each ambulance sighting, encoded off the UI thread
+    incidents = IncidentRecorder(INCIDENT_DIR, fps) if record_incidents else None
+    history = get_history() if history_on else None
+    history_drawn = 0.0
+
+    for frame_index, detections, img, captured_at in results:
+        # Detection happened upstream (serially or on the pipeline threads)
         
-        # Spatial Counting
+        # Spatial Counting (vectorized over all detections)
         h, w, _ = img.shape
-        roi_h_y1, roi_h_y2 = int(h * 0.35), int(h * 0.65)
-        roi_v_x1, roi_v_x2 = int(w * 0.35), int(w * 0.65)
-        
-        count_h = 0
-        count_v = 0
-        amb_detected = False
-        
-        for obj in objects:
-            cx, cy = obj["x"] + obj["w"]//2, obj["y"] + obj["h"]//2
-            if roi_h_y1 < cy < roi_h_y2: count_h += 1
-            elif roi_v_x1 < cx < roi_v_x2: count_v += 1
-            if obj["label"] == "ambulance": amb_detected = True
+        count_h, count_v = DEFAULT_ROI.count_lanes(detections, w, h)
+
+        # Tracking: stable IDs -> flow (veh/min) and queues per approach
+        if tracker is None:
+            tracker = VehicleTracker(roi=DEFAULT_ROI, frame_size=(w, h))
+        tracker.update(detections, captured_at)
+        flow = tracker.flow_rates()
+        queues = tracker.queue_lengths()
+        amb_detected = bool((detections["label"] == LABEL_CODES["ambulance"]).any())
+        congestion = congestion_level(count_h + count_v)
             
-        # AI Logic
-        new_signal = decide_direction(count_h, count_v, amb_detected)
+        # AI Logic (stateful: min green, hysteresis, emergency clearance)
+        new_signal = controller.update(
+            count_h, count_v, amb_detected, captured_at,
+            (queues['right'] + queues['left'], queues['down'] + queues['up']),
+        )
+
+        if det_log is not None:
+            det_log.write_frame(
+                frame_index, time.time() - (time.monotonic() - captured_at), detections,
+                DEFAULT_ROI.assign_lanes(detections, w, h), new_signal,
+            )
         
+        if incidents is not None:
+            incidents.add(img, amb_detected, captured_at)
+        if history is not None:
+            history.add(time.time(), count_h, count_v, congestion, amb_detected, stream=str(source_path))
+        if events is not None:
+            events.frame(
+                frame_index, count_h, count_v, len(detections), amb_detected, new_signal, congestion,
+                queue_h=queues['right'] + queues['left'], queue_v=queues['down'] + queues['up'],
+            )
+
         # Voice Alerts & Logic Display
         current_time = time.time()
         log_text = ""
@@ -141,21 +255,17 @@ if start_button:
         # State Management for Voice
         if 'emergency_active' not in st.session_state: st.session_state.emergency_active = False
         
-        if amb_detected:
+        if new_signal == "Emergency":
             log_text = "🚨 <span class='highlight-red'>EMERGENCY VEHICLE DETECTED!</span><br>Override: Priority to Ambulance Lane."
             
             if not st.session_state.emergency_active:
                 # Emergency JUST started
-                speak_text("Emergency vehicle detected. Priority given to ambulance lane.")
+                speak_text("Emergency vehicle detected. Priority given to ambulance lane.", PRIORITY_EMERGENCY)
                 st.session_state.emergency_active = True
                 st.session_state.last_voice_time = current_time
             
-            # Keep signal updated to ambulance direction (handled by decide_direction logic or override)
-            # In simulation, we might need to infer direction if not passed explicitly, 
-            # but here we rely on decide_direction returning "Emergency" or specific direction.
-            
         else:
-            # No ambulance
+            # No preemption (the controller holds Emergency until the ambulance has been gone a while)
             if st.session_state.emergency_active:
                 # Emergency JUST ended
                 speak_text("Emergency vehicle passed. Reverting to normal traffic flow.")
@@ -163,7 +273,9 @@ if start_button:
                 st.session_state.last_voice_time = current_time
             
             # Normal Volume Logic
-            if new_signal != st.session_state.last_signal:
+            if new_signal == "Clearance":
+                log_text = "🟡 Clearing intersection<br>All approaches held at red."
+            elif new_signal != st.session_state.last_signal:
                 # Signal Switch
                 reason = "Higher Volume"
                 log_text = f"⚖️ <span class='highlight-yellow'>Volume Shift Detected</span><br>H: {count_h} | V: {count_v}<br>Switching Signal to {new_signal}."
@@ -178,20 +290,49 @@ if start_button:
                 log_text = f"✅ System Stable<br>Maintaining Green for {new_signal}."
 
         # Update UI
+        if metrics is not None:
+            t_render = metrics.now()
         stframe.image(img, channels="BGR", use_container_width=True)
         
         metric_h.markdown(f"<div class='metric-box'><div class='metric-value'>{count_h}</div><div class='metric-label'>Horizontal Lane</div></div>", unsafe_allow_html=True)
         metric_v.markdown(f"<div class='metric-box'><div class='metric-value'>{count_v}</div><div class='metric-label'>Vertical Lane</div></div>", unsafe_allow_html=True)
+        metric_flow.markdown(
+            f"Flow (veh/min) H: {flow['right'] + flow['left']:.0f} | V: {flow['down'] + flow['up']:.0f}"
+            f" &nbsp;·&nbsp; Queue H: {queues['right'] + queues['left']} | V: {queues['down'] + queues['up']}",
+            unsafe_allow_html=True,
+        )
         
         log_placeholder.markdown(f"<div class='status-panel'>{log_text}</div>", unsafe_allow_html=True)
         
-        if amb_detected:
+        if new_signal == "Emergency":
              signal_status.error("🚨 EMERGENCY PRIORITY ACTIVE")
+        elif new_signal == "Clearance":
+            signal_status.warning("🟡 Clearance: all lanes RED")
         elif new_signal == "Horizontal":
             signal_status.success("🟢 Horizontal Lane is GREEN")
         elif new_signal == "Vertical":
             signal_status.success("🟢 Vertical Lane is GREEN")
 
-        time.sleep(0.03) # Limit FPS for UI stability
+        # Per-second means from the ring buffer; redrawn every couple of seconds, not per frame
+        if history is not None and current_time - history_drawn >= 2:
+            series = history.series("second", current_time - 600, stream=str(source_path))
+            history_chart.line_chart({"Horizontal": series["mean_h"], "Vertical": series["mean_v"]})
+            history_drawn = current_time
+
+        if metrics is not None:
+            metrics.observe_stage("render", metrics.now() - t_render)
+            metrics.inc("ui_frames")
+
+    st.success("Simulation Complete")
+
+    if det_log is not None:
+        det_log.close()
+    if incidents is not None:
+        incidents.close()
+    if history is not None:
+        history.flush(close_open=True)
 
-    cap.release()
+    if pipelined:
+        pipeline.stop()
+    else:
+        cap.release()
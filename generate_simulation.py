@@ -1,4 +1,7 @@
+import argparse
 import cv2
+import functools
+import json
 import numpy as np
 import random
 import os
@@ -6,7 +9,8 @@ import sys
 
 # Ensure src modules import correctly
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from src.signal_logic import decide_direction
+from src.signal_logic import CONTROLLERS, decide_direction, make_controller
+from src.video_output import open_writer
 
 # Configuration
 WIDTH, HEIGHT = 1280, 720
@@ -86,6 +90,98 @@ def draw_vehicle_detailed(frame, v):
             cv2.circle(frame, (x, y), 4, (0,0,255), -1)
             cv2.circle(frame, (x+w, y+h), 4, (0,0,255), -1)
 
+def vehicle_bounds(v):
+    """Pixel box draw_vehicle_detailed can touch (bus stripes and siren dots overhang by a few px)."""
+    x, y, w, h = int(v.x), int(v.y), int(v.w), int(v.h)
+    return x - 5, y - 5, x + w + 6, y + h + 6
+
+
+# ------------------------------------------------
+# STATIC LAYER: drawn once per geometry, restored per dirty region
+# ------------------------------------------------
+CAPTION = "Smart Traffic AI | VIKAS IGU Meerpur"
+LIGHT_RADIUS = 15
+LIGHT_CENTRES = {
+    "Vertical": [(V_ROAD_X1 - 30, STOP_Y_TOP - 30), (V_ROAD_X2 + 30, STOP_Y_BOTTOM + 30)],
+    "Horizontal": [(STOP_X_RIGHT + 30, H_ROAD_Y1 - 30), (STOP_X_LEFT - 30, H_ROAD_Y2 + 30)],
+}
+
+
+@functools.lru_cache(maxsize=4)
+def render_background(width=WIDTH, height=HEIGHT):
+    """Grass, roads, zebra crossings, centre lines and caption (read-only)."""
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = COLOR_GRASS
+
+    # Roads
+    cv2.rectangle(frame, (0, H_ROAD_Y1), (width, H_ROAD_Y2), COLOR_ROAD, -1)
+    cv2.rectangle(frame, (V_ROAD_X1, 0), (V_ROAD_X2, height), COLOR_ROAD, -1)
+
+    # Markings
+    for z in range(H_ROAD_Y1+10, H_ROAD_Y2-10, 25):
+        cv2.line(frame, (STOP_X_LEFT-40, z), (STOP_X_LEFT, z), COLOR_ZEBRA, 12)
+        cv2.line(frame, (STOP_X_RIGHT, z), (STOP_X_RIGHT+40, z), COLOR_ZEBRA, 12)
+    for z in range(V_ROAD_X1+10, V_ROAD_X2-10, 25):
+        cv2.line(frame, (z, STOP_Y_TOP-40), (z, STOP_Y_TOP), COLOR_ZEBRA, 12)
+        cv2.line(frame, (z, STOP_Y_BOTTOM), (z, STOP_Y_BOTTOM+40), COLOR_ZEBRA, 12)
+
+    cv2.line(frame, (0, (H_ROAD_Y1+H_ROAD_Y2)//2), (STOP_X_LEFT, (H_ROAD_Y1+H_ROAD_Y2)//2), COLOR_YELLOW, 2)
+    cv2.line(frame, (STOP_X_RIGHT, (H_ROAD_Y1+H_ROAD_Y2)//2), (width, (H_ROAD_Y1+H_ROAD_Y2)//2), COLOR_YELLOW, 2)
+    cv2.line(frame, ((V_ROAD_X1+V_ROAD_X2)//2, 0), ((V_ROAD_X1+V_ROAD_X2)//2, STOP_Y_TOP), COLOR_YELLOW, 2)
+    cv2.line(frame, ((V_ROAD_X1+V_ROAD_X2)//2, STOP_Y_BOTTOM), ((V_ROAD_X1+V_ROAD_X2)//2, height), COLOR_YELLOW, 2)
+
+    # Caption sits on the grass, where no vehicle is ever drawn
+    cv2.putText(frame, CAPTION, (width-450, height-30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 1)
+
+    frame.flags.writeable = False
+    return frame
+
+
+class DirtyCanvas:
+    """
+    One reusable frame over a static background. Drawing code marks the
+    boxes it paints; begin() copies back only those boxes from the
+    background instead of the whole frame.
+    """
+
+    def __init__(self, background):
+        self.background = background
+        self.frame = background.copy()
+        self.height, self.width = background.shape[:2]
+        self._dirty = []
+
+    def begin(self):
+        bg, frame = self.background, self.frame
+        for x1, y1, x2, y2 in self._dirty:
+            frame[y1:y2, x1:x2] = bg[y1:y2, x1:x2]
+        self._dirty = []
+        return frame
+
+    def mark(self, x1, y1, x2, y2):
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, self.width), min(y2, self.height)
+        if x2 > x1 and y2 > y1:
+            self._dirty.append((x1, y1, x2, y2))
+
+    def draw_vehicle(self, v):
+        draw_vehicle_detailed(self.frame, v)
+        self.mark(*vehicle_bounds(v))
+
+    def draw_lights(self, current_signal):
+        r = LIGHT_RADIUS + 1
+        for axis, centres in LIGHT_CENTRES.items():
+            color = (0, 255, 0) if current_signal == axis else (0, 0, 255)
+            for cx, cy in centres:
+                cv2.circle(self.frame, (cx, cy), LIGHT_RADIUS, color, -1)
+                self.mark(cx - r, cy - r, cx + r + 1, cy + r + 1)
+
+    def draw_text(self, text, org, scale, color, thickness):
+        cv2.putText(self.frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        x, y = org
+        self.mark(x - thickness - 1, y - th - thickness - 1, x + tw + thickness + 1, y + baseline + thickness + 1)
+
+
 class Vehicle:
     def __init__(self, v_type, direction, x, y):
         self.type = v_type
@@ -179,10 +275,364 @@ class Vehicle:
         elif self.direction == 'down': self.y += self.speed
         elif self.direction == 'up': self.y -= self.speed
 
-def generate():
+# ------------------------------------------------
+# VECTORIZED ENGINE: struct-of-arrays, per-lane leader lookup
+# ------------------------------------------------
+VEHICLE_TYPES = ["car", "bike", "auto", "bus", "truck", "ambulance"]
+AMBULANCE = VEHICLE_TYPES.index("ambulance")
+DIRECTIONS = ["right", "left", "down", "up"]
+RIGHT, LEFT, DOWN, UP = range(4)
+
+# (w, h) for vertical travel, as in Vehicle
+TYPE_SIZE = np.array([(30, 50), (15, 30), (25, 35), (40, 90), (40, 100), (35, 60)], dtype=np.float64)
+# (low, high) base speed per type
+TYPE_SPEED = np.array([(6.0, 8.0), (7.0, 9.0), (5.0, 7.0), (4.0, 5.0), (3.0, 4.0), (9.0, 9.0)])
+
+# Unit travel vector per direction
+DIR_DX = np.array([1.0, -1.0, 0.0, 0.0])
+DIR_DY = np.array([0.0, 0.0, 1.0, -1.0])
+
+# Spawn offsets snap to discrete lanes (10..70px from the road edge) so
+# "same lane" is an exact key instead of Vehicle.move's |dy| < 20 scan
+LANE_OFFSETS = np.array([10, 30, 50, 70])
+
+
+class VehicleView:
+    """Read-only per-vehicle view with the attributes draw_vehicle_detailed uses."""
+
+    __slots__ = ("type", "direction", "x", "y", "w", "h")
+
+    def __init__(self, v_type, direction, x, y, w, h):
+        self.type, self.direction = v_type, direction
+        self.x, self.y, self.w, self.h = x, y, w, h
+
+
+class TrafficSim:
+    """
+    Bulk version of the Vehicle model: every vehicle lives in parallel NumPy
+    arrays and one step() updates all of them at once.
+
+    Following distance comes from a per-lane sort: vehicles are keyed by
+    (direction, lane), ordered by progress along their direction, and each
+    one's leader is simply the next vehicle in its key group. Vehicles in
+    different lanes or on crossing roads don't interact (the signal keeps
+    crossing traffic apart), unlike the all-pairs scan in Vehicle.move.
+    """
+
+    FIELDS = ("x", "y", "w", "h", "speed", "base_speed", "direction", "vtype", "lane",
+              "spawned", "waited", "travelled")
+
+    # Below this speed (px/frame) a vehicle counts as waiting / queued
+    STOPPED_SPEED = 0.5
+
+    def __init__(self, seed=None, capacity=256, spawn_rate=0.15, burst_rate=0.3,
+                 burst_period=300, ambulance_every=700):
+        self.rng = np.random.default_rng(seed)
+        self.spawn_rate = spawn_rate
+        self.burst_rate = burst_rate
+        self.burst_period = burst_period
+        self.ambulance_every = ambulance_every
+
+        self.n = 0
+        self._alloc(capacity)
+        self.frame = 0
+        self._amb_timer = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Throughput / delay accumulators read by stats()."""
+        self.spawned_total = 0
+        self.exited = 0
+        self.wait_frames_total = 0.0
+        self.delay_frames_total = 0.0
+        self.ambulance_delays = []
+        self.ambulances_blocked = 0
+        self.queue_sum = np.zeros(2)
+        self.queue_max = np.zeros(2, dtype=np.int64)
+        self.queue_now = np.zeros(2, dtype=np.int64)
+        self.steps = 0
+
+    def _alloc(self, capacity):
+        old = getattr(self, "x", None)
+        for name in self.FIELDS:
+            dtype = np.int8 if name in ("direction", "vtype", "lane") else np.float64
+            arr = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                arr[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, arr)
+
+    # --- SPAWNING ---
+    def add(self, vtype, direction, x, y, lane=0):
+        if self.n == len(self.x):
+            self._alloc(len(self.x) * 2)
+        i = self.n
+        w, h = TYPE_SIZE[vtype]
+        if direction in (RIGHT, LEFT):
+            w, h = h, w
+        lo, hi = TYPE_SPEED[vtype]
+        self.x[i], self.y[i], self.w[i], self.h[i] = x, y, w, h
+        self.base_speed[i] = self.speed[i] = self.rng.uniform(lo, hi)
+        self.direction[i], self.vtype[i], self.lane[i] = direction, vtype, lane
+        self.spawned[i], self.waited[i], self.travelled[i] = self.frame, 0, 0
+        self.n += 1
+        self.spawned_total += 1
+
+    def _free(self, x, y, dx, dy):
+        n = self.n
+        return not np.any((np.abs(self.x[:n] - x) < dx) & (np.abs(self.y[:n] - y) < dy))
+
+    def _spawn_position(self, direction, lane):
+        offset = LANE_OFFSETS[lane]
+        if direction == RIGHT: return -100, H_ROAD_Y2 - offset - 20
+        if direction == LEFT: return WIDTH + 50, H_ROAD_Y1 + offset
+        if direction == DOWN: return V_ROAD_X1 + offset, -100
+        return V_ROAD_X2 - offset - 20, HEIGHT + 50
+
+    def spawn(self):
+        """Same spawn schedule as generate(): base rate, alternating bursts, periodic ambulance."""
+        rng = self.rng
+        rate_h = rate_v = self.spawn_rate
+        if self.frame % self.burst_period < self.burst_period // 2: rate_h = self.burst_rate
+        else: rate_v = self.burst_rate
+
+        self._amb_timer += 1
+        if self._amb_timer > self.ambulance_every:
+            self._amb_timer = 0
+            d = int(rng.integers(4))
+            lane = 2
+            x, y = self._spawn_position(d, lane)
+            if self._free(x, y, 100, 100):
+                self.add(AMBULANCE, d, x, y, lane)
+            else:
+                # Entry blocked by a queue: the ambulance never appears (as in generate())
+                self.ambulances_blocked += 1
+
+        regular = [VEHICLE_TYPES.index(t) for t in ("car", "auto", "bike", "bus")]
+        for rate, dirs, (dx, dy) in ((rate_h, (RIGHT, LEFT), (80, 60)), (rate_v, (DOWN, UP), (60, 80))):
+            if rng.random() < rate:
+                d = dirs[int(rng.integers(2))]
+                lane = int(rng.integers(len(LANE_OFFSETS)))
+                x, y = self._spawn_position(d, lane)
+                if self._free(x, y, dx, dy):
+                    self.add(regular[int(rng.integers(len(regular)))], d, x, y, lane)
+
+    # --- DECISION INPUTS ---
+    def counts(self):
+        """Ground-truth (count_h, count_v, ambulance_direction or None)."""
+        n = self.n
+        cx = self.x[:n] + self.w[:n] / 2
+        cy = self.y[:n] + self.h[:n] / 2
+        in_h = (cy > H_ROAD_Y1) & (cy < H_ROAD_Y2)
+        in_v = ~in_h & (cx > V_ROAD_X1) & (cx < V_ROAD_X2)
+        amb = np.flatnonzero(self.vtype[:n] == AMBULANCE)
+        amb_dir = DIRECTIONS[self.direction[amb[-1]]] if len(amb) else None
+        return int(in_h.sum()), int(in_v.sum()), amb_dir
+
+    def decide(self):
+        """decide_direction on ground truth, resolving Emergency to the ambulance's axis."""
+        count_h, count_v, amb_dir = self.counts()
+        signal = decide_direction(count_h, count_v, amb_dir is not None)
+        if signal == "Emergency":
+            return "Vertical" if amb_dir in ("up", "down") else "Horizontal"
+        return signal
+
+    def control(self, controller):
+        """
+        Feed ground truth (counts, last step's queues, ambulance) to a
+        signal controller. Emergency resolves to the ambulance's axis;
+        Clearance is passed through and holds every approach at red.
+        """
+        count_h, count_v, amb_dir = self.counts()
+        signal = controller.update(
+            count_h, count_v, amb_dir is not None, self.frame / float(FPS), tuple(self.queue_now)
+        )
+        if signal == "Emergency":
+            return "Vertical" if amb_dir in ("up", "down") else "Horizontal"
+        return signal
+
+    # --- PHYSICS ---
+    def step(self, green_direction):
+        n = self.n
+        if n == 0:
+            self.frame += 1
+            self.steps += 1
+            self.queue_now[:] = 0
+            return
+        x, y, w, h = self.x[:n], self.y[:n], self.w[:n], self.h[:n]
+        d = self.direction[:n].astype(np.intp)
+        speed, base = self.speed[:n], self.base_speed[:n]
+        horizontal = d <= LEFT
+        is_amb = self.vtype[:n] == AMBULANCE
+
+        # Collision avoidance: leader = next vehicle in the same (direction, lane)
+        progress = x * DIR_DX[d] + y * DIR_DY[d]
+        length = np.where(horizontal, w, h)
+        key = d * len(LANE_OFFSETS) + self.lane[:n]
+        order = np.lexsort((progress, key))
+        k, p, ln = key[order], progress[order], length[order]
+        has_leader = np.zeros(n, dtype=bool)
+        has_leader[:-1] = k[1:] == k[:-1]
+        gap_sorted = np.full(n, 9999.0)
+        forward = (d[order] == RIGHT) | (d[order] == DOWN)
+        lead_gap = p[1:] - p[:-1] - np.where(forward[:-1], ln[:-1], ln[1:])
+        gap_sorted[:-1] = np.where(has_leader[:-1], lead_gap, 9999.0)
+        min_dist = np.empty(n)
+        min_dist[order] = gap_sorted
+
+        # Traffic light logic
+        is_green = (
+            ((green_direction == "Emergency") & is_amb)
+            | ((green_direction == "Horizontal") & horizontal)
+            | ((green_direction == "Vertical") & ~horizontal)
+        )
+
+        # Stop line logic
+        dist_to_stop = np.full(n, 9999.0)
+        waiting = ~is_green & ~is_amb
+        for direction, before, dist in (
+            (RIGHT, x < STOP_X_LEFT, STOP_X_LEFT - (x + w)),
+            (LEFT, x > STOP_X_RIGHT, x - STOP_X_RIGHT),
+            (DOWN, y < STOP_Y_TOP, STOP_Y_TOP - (y + h)),
+            (UP, y > STOP_Y_BOTTOM, y - STOP_Y_BOTTOM),
+        ):
+            sel = waiting & (d == direction) & before
+            dist_to_stop[sel] = dist[sel]
+
+        # Target speed
+        safe_dist = 40
+        target = base.copy()
+        target[min_dist < safe_dist * 2] = base[min_dist < safe_dist * 2] * 0.5
+        target[min_dist < safe_dist] = 0
+        approaching = (dist_to_stop < 150) & (dist_to_stop > 0)
+        target[approaching] = np.minimum(target[approaching], dist_to_stop[approaching] / 10)
+        target[dist_to_stop <= 5] = 0
+
+        # Physics
+        speed += np.where(speed < target, 0.3, np.where(speed > target, -0.5, 0.0))
+        np.maximum(speed, 0, out=speed)
+
+        # Move
+        x += speed * DIR_DX[d]
+        y += speed * DIR_DY[d]
+
+        # Waiting time + queues (stopped vehicles per axis)
+        stopped = speed < self.STOPPED_SPEED
+        self.waited[:n] += stopped
+        self.travelled[:n] += speed
+        queues = self.queue_now
+        queues[:] = (stopped & horizontal).sum(), (stopped & ~horizontal).sum()
+        self.queue_sum += queues
+        np.maximum(self.queue_max, queues, out=self.queue_max)
+        self.steps += 1
+
+        # Drop vehicles that left the scene (compact in place)
+        keep = (x > -150) & (x < WIDTH + 150) & (y > -150) & (y < HEIGHT + 150)
+        if not keep.all():
+            self._record_exits(~keep)
+            m = int(keep.sum())
+            for name in self.FIELDS:
+                arr = getattr(self, name)
+                arr[:m] = arr[:n][keep]
+            self.n = m
+
+        self.frame += 1
+
+    def _record_exits(self, gone):
+        n = self.n
+        lifetime = self.frame + 1 - self.spawned[:n][gone]
+        # Delay = time in the scene minus the time it would take at free-flow speed
+        free_flow = self.travelled[:n][gone] / self.base_speed[:n][gone]
+        delay = np.maximum(lifetime - free_flow, 0)
+
+        self.exited += int(gone.sum())
+        self.wait_frames_total += float(self.waited[:n][gone].sum())
+        self.delay_frames_total += float(delay.sum())
+        self.ambulance_delays.extend(delay[self.vtype[:n][gone] == AMBULANCE].tolist())
+
+    def stats(self, fps=FPS):
+        """Throughput metrics for the run so far (times in seconds)."""
+        seconds = self.steps / float(fps) if self.steps else 0.0
+        steps = max(self.steps, 1)
+
+        # Vehicles still in the scene count with their wait/delay so far,
+        # otherwise a starved queue that never exits would look delay-free
+        n = self.n
+        lifetime = self.frame - self.spawned[:n]
+        in_scene_delay = np.maximum(lifetime - self.travelled[:n] / self.base_speed[:n], 0)
+        vehicles = max(self.exited + n, 1)
+        wait = self.wait_frames_total + float(self.waited[:n].sum())
+        delay = self.delay_frames_total + float(in_scene_delay.sum())
+        # Same for ambulances: one held at a red must not report zero delay
+        amb_delays = self.ambulance_delays + in_scene_delay[self.vtype[:n] == AMBULANCE].tolist()
+
+        return {
+            "frames": self.steps,
+            "sim_seconds": seconds,
+            "spawned": self.spawned_total,
+            "exited": self.exited,
+            "in_scene": n,
+            "throughput_per_hour": self.exited * 3600.0 / seconds if seconds else 0.0,
+            "avg_wait_s": wait / vehicles / fps,
+            "avg_delay_s": delay / vehicles / fps,
+            "mean_queue_h": float(self.queue_sum[0] / steps),
+            "mean_queue_v": float(self.queue_sum[1] / steps),
+            "max_queue_h": int(self.queue_max[0]),
+            "max_queue_v": int(self.queue_max[1]),
+            "ambulances": len(amb_delays),
+            "ambulances_blocked": self.ambulances_blocked,
+            # NaN when no ambulance was seen, so it can't pass for "no delay"
+            "ambulance_delay_s": float(np.mean(amb_delays)) / fps if amb_delays else float("nan"),
+        }
+
+    def views(self):
+        """Per-vehicle objects for drawing (sorted by y like generate())."""
+        n = self.n
+        order = np.argsort(self.y[:n], kind="stable")
+        return [
+            VehicleView(VEHICLE_TYPES[self.vtype[i]], DIRECTIONS[self.direction[i]],
+                        self.x[i], self.y[i], self.w[i], self.h[i])
+            for i in order
+        ]
+
+
+# ------------------------------------------------
+# RENDER-FREE MODE: no drawing, no encoding, just metrics
+# ------------------------------------------------
+def run_headless(seed=None, frames=TOTAL_FRAMES, decision_interval=10, controller="greedy",
+                 policy=None, **sim_params):
+    """
+    Step TrafficSim without drawing or encoding. Every `decision_interval`
+    frames the named signal controller (see signal_logic.CONTROLLERS) gets
+    ground-truth counts and queues; `policy` holds its make_controller kwargs.
+    Returns the run's throughput metrics.
+    """
+    sim = TrafficSim(seed, **sim_params)
+    ctrl = make_controller(controller, **(policy or {}))
+    current_signal = "Horizontal"
+    switches = 0
+    for i in range(frames):
+        sim.spawn()
+        if i % decision_interval == 0:
+            signal = sim.control(ctrl)
+            switches += signal != current_signal
+            current_signal = signal
+        sim.step(current_signal)
+
+    result = sim.stats()
+    result["seed"] = seed
+    result["signal_switches"] = switches
+    return result
+
+
+def generate(engine="objects", seed=None, controller=None, encoder="cv2"):
+    """
+    Render the simulation video.
+    engine: "objects" (per-Vehicle loop) or "vector" (TrafficSim arrays).
+    encoder: "cv2" (mp4v) or "ffmpeg" (x264 over a pipe); either runs on a
+    background thread while the next frame is simulated and drawn.
+    """
     os.makedirs("videos", exist_ok=True)
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(OUTPUT_PATH, fourcc, FPS, (WIDTH, HEIGHT))
+    out = open_writer(OUTPUT_PATH, FPS, (WIDTH, HEIGHT), encoder)
     
     vehicles = []
     
@@ -192,136 +642,146 @@ def generate():
     
     # Timers
     amb_timer = 0
+
+    if seed is not None:
+        random.seed(seed)
+    sim = TrafficSim(seed) if engine == "vector" else None
+    ctrl = make_controller(controller) if controller else None
     
+    canvas = DirtyCanvas(render_background(WIDTH, HEIGHT))
+
     for i in range(TOTAL_FRAMES):
-        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
-        frame[:] = COLOR_GRASS
-        
-        # Roads
-        cv2.rectangle(frame, (0, H_ROAD_Y1), (WIDTH, H_ROAD_Y2), COLOR_ROAD, -1)
-        cv2.rectangle(frame, (V_ROAD_X1, 0), (V_ROAD_X2, HEIGHT), COLOR_ROAD, -1)
-        
-        # Markings
-        for z in range(H_ROAD_Y1+10, H_ROAD_Y2-10, 25):
-            cv2.line(frame, (STOP_X_LEFT-40, z), (STOP_X_LEFT, z), COLOR_ZEBRA, 12)
-            cv2.line(frame, (STOP_X_RIGHT, z), (STOP_X_RIGHT+40, z), COLOR_ZEBRA, 12)
-        for z in range(V_ROAD_X1+10, V_ROAD_X2-10, 25):
-            cv2.line(frame, (z, STOP_Y_TOP-40), (z, STOP_Y_TOP), COLOR_ZEBRA, 12)
-            cv2.line(frame, (z, STOP_Y_BOTTOM), (z, STOP_Y_BOTTOM+40), COLOR_ZEBRA, 12)
-            
-        cv2.line(frame, (0, (H_ROAD_Y1+H_ROAD_Y2)//2), (STOP_X_LEFT, (H_ROAD_Y1+H_ROAD_Y2)//2), COLOR_YELLOW, 2)
-        cv2.line(frame, (STOP_X_RIGHT, (H_ROAD_Y1+H_ROAD_Y2)//2), (WIDTH, (H_ROAD_Y1+H_ROAD_Y2)//2), COLOR_YELLOW, 2)
-        cv2.line(frame, ((V_ROAD_X1+V_ROAD_X2)//2, 0), ((V_ROAD_X1+V_ROAD_X2)//2, STOP_Y_TOP), COLOR_YELLOW, 2)
-        cv2.line(frame, ((V_ROAD_X1+V_ROAD_X2)//2, STOP_Y_BOTTOM), ((V_ROAD_X1+V_ROAD_X2)//2, HEIGHT), COLOR_YELLOW, 2)
-
-        # --- HIGH INTENSITY SPAWNING ---
-        # Constant pressure from all sides
-        rate_h = 0.15
-        rate_v = 0.15
+        # Static layer: restore only what vehicles / lights / text covered last frame
+        frame = canvas.begin()
+
+        if sim is not None:
+            # --- VECTORIZED ENGINE: spawn, decide, move all vehicles in bulk ---
+            sim.spawn()
+            if i % 10 == 0:
+                current_signal = sim.control(ctrl) if ctrl is not None else sim.decide()
+            sim.step(current_signal)
+            for v in sim.views():
+                canvas.draw_vehicle(v)
+        else:
+            # --- HIGH INTENSITY SPAWNING ---
+            # Constant pressure from all sides
+            rate_h = 0.15
+            rate_v = 0.15
         
-        # Random bursts
-        if i % 300 < 150: rate_h = 0.3 # Burst Horizontal
-        else: rate_v = 0.3 # Burst Vertical
-
-        # Ambulance Spawning (Every ~12 seconds)
-        amb_timer += 1
-        if amb_timer > 700: # ~12s at 60fps
-            amb_timer = 0
-            # Spawn ambulance from random direction
-            d = random.choice(['right', 'left', 'down', 'up'])
-            if d == 'right': x, y = -100, H_ROAD_Y2 - 60
-            elif d == 'left': x, y = WIDTH + 50, H_ROAD_Y1 + 60
-            elif d == 'down': x, y = V_ROAD_X1 + 60, -100
-            elif d == 'up': x, y = V_ROAD_X2 - 60, HEIGHT + 50
+            # Random bursts
+            if i % 300 < 150: rate_h = 0.3 # Burst Horizontal
+            else: rate_v = 0.3 # Burst Vertical
+
+            # Ambulance Spawning (Every ~12 seconds)
+            amb_timer += 1
+            if amb_timer > 700: # ~12s at 60fps
+                amb_timer = 0
+                # Spawn ambulance from random direction
+                d = random.choice(['right', 'left', 'down', 'up'])
+                if d == 'right': x, y = -100, H_ROAD_Y2 - 60
+                elif d == 'left': x, y = WIDTH + 50, H_ROAD_Y1 + 60
+                elif d == 'down': x, y = V_ROAD_X1 + 60, -100
+                elif d == 'up': x, y = V_ROAD_X2 - 60, HEIGHT + 50
             
-            # Ensure no overlap for ambulance
-            overlap = False
-            for v in vehicles:
-                if abs(v.x - x) < 100 and abs(v.y - y) < 100: overlap = True
-            if not overlap:
-                vehicles.append(Vehicle("ambulance", d, x, y))
-
-        # Regular Traffic Spawn
-        if random.random() < rate_h:
-            d = random.choice(['right', 'left'])
-            offset = random.randint(10, 80)
-            if d == 'right': x, y = -100, H_ROAD_Y2 - offset - 20
-            else: x, y = WIDTH + 50, H_ROAD_Y1 + offset
+                # Ensure no overlap for ambulance
+                overlap = False
+                for v in vehicles:
+                    if abs(v.x - x) < 100 and abs(v.y - y) < 100: overlap = True
+                if not overlap:
+                    vehicles.append(Vehicle("ambulance", d, x, y))
+
+            # Regular Traffic Spawn
+            if random.random() < rate_h:
+                d = random.choice(['right', 'left'])
+                offset = random.randint(10, 80)
+                if d == 'right': x, y = -100, H_ROAD_Y2 - offset - 20
+                else: x, y = WIDTH + 50, H_ROAD_Y1 + offset
             
-            overlap = False
-            for v in vehicles:
-                if abs(v.x - x) < 80 and abs(v.y - y) < 60: overlap = True
-            if not overlap: vehicles.append(Vehicle(random.choice(["car", "auto", "bike", "bus"]), d, x, y))
+                overlap = False
+                for v in vehicles:
+                    if abs(v.x - x) < 80 and abs(v.y - y) < 60: overlap = True
+                if not overlap: vehicles.append(Vehicle(random.choice(["car", "auto", "bike", "bus"]), d, x, y))
             
-        if random.random() < rate_v:
-            d = random.choice(['down', 'up'])
-            offset = random.randint(10, 80)
-            if d == 'down': x, y = V_ROAD_X1 + offset, -100
-            else: x, y = V_ROAD_X2 - offset - 20, HEIGHT + 50
+            if random.random() < rate_v:
+                d = random.choice(['down', 'up'])
+                offset = random.randint(10, 80)
+                if d == 'down': x, y = V_ROAD_X1 + offset, -100
+                else: x, y = V_ROAD_X2 - offset - 20, HEIGHT + 50
             
-            overlap = False
-            for v in vehicles:
-                if abs(v.x - x) < 60 and abs(v.y - y) < 80: overlap = True
-            if not overlap: vehicles.append(Vehicle(random.choice(["car", "auto", "bike", "bus"]), d, x, y))
-
-        # Logic Update
-        if i % 10 == 0:
-            count_h = 0
-            count_v = 0
-            amb_detected = False
-            amb_direction = None
+                overlap = False
+                for v in vehicles:
+                    if abs(v.x - x) < 60 and abs(v.y - y) < 80: overlap = True
+                if not overlap: vehicles.append(Vehicle(random.choice(["car", "auto", "bike", "bus"]), d, x, y))
+
+            # Logic Update
+            if i % 10 == 0:
+                count_h = 0
+                count_v = 0
+                amb_detected = False
+                amb_direction = None
             
-            for v in vehicles:
-                cx, cy = v.x + v.w/2, v.y + v.h/2
-                if H_ROAD_Y1 < cy < H_ROAD_Y2: count_h += 1
-                elif V_ROAD_X1 < cx < V_ROAD_X2: count_v += 1
+                for v in vehicles:
+                    cx, cy = v.x + v.w/2, v.y + v.h/2
+                    if H_ROAD_Y1 < cy < H_ROAD_Y2: count_h += 1
+                    elif V_ROAD_X1 < cx < V_ROAD_X2: count_v += 1
                 
-                if v.type == "ambulance": 
-                    amb_detected = True
-                    amb_direction = v.direction
+                    if v.type == "ambulance": 
+                        amb_detected = True
+                        amb_direction = v.direction
             
-            # AI Decision
-            signal = decide_direction(count_h, count_v, amb_detected)
+                # AI Decision
+                signal = decide_direction(count_h, count_v, amb_detected)
             
-            # If Emergency, we must know WHICH direction to give green
-            if signal == "Emergency":
-                # Find direction of ambulance
-                if amb_direction in ['left', 'right']: current_signal = "Horizontal"
-                elif amb_direction in ['up', 'down']: current_signal = "Vertical"
-                else: current_signal = "Horizontal" # Default
-            else:
-                current_signal = signal
+                # If Emergency, we must know WHICH direction to give green
+                if signal == "Emergency":
+                    # Find direction of ambulance
+                    if amb_direction in ['left', 'right']: current_signal = "Horizontal"
+                    elif amb_direction in ['up', 'down']: current_signal = "Vertical"
+                    else: current_signal = "Horizontal" # Default
+                else:
+                    current_signal = signal
 
-        # Move & Draw
-        vehicles.sort(key=lambda v: v.y)
-        for v in vehicles:
-            v.move(current_signal, vehicles)
-            draw_vehicle_detailed(frame, v)
+            # Move & Draw
+            vehicles.sort(key=lambda v: v.y)
+            for v in vehicles:
+                v.move(current_signal, vehicles)
+                canvas.draw_vehicle(v)
 
-        vehicles = [v for v in vehicles if -150 < v.x < WIDTH + 150 and -150 < v.y < HEIGHT + 150]
+            vehicles = [v for v in vehicles if -150 < v.x < WIDTH + 150 and -150 < v.y < HEIGHT + 150]
 
         # Lights
-        color_h = (0, 255, 0) if current_signal == "Horizontal" else (0, 0, 255)
-        color_v = (0, 255, 0) if current_signal == "Vertical" else (0, 0, 255)
-        
-        cv2.circle(frame, (V_ROAD_X1 - 30, STOP_Y_TOP - 30), 15, color_v, -1)
-        cv2.circle(frame, (STOP_X_RIGHT + 30, H_ROAD_Y1 - 30), 15, color_h, -1)
-        cv2.circle(frame, (V_ROAD_X2 + 30, STOP_Y_BOTTOM + 30), 15, color_v, -1)
-        cv2.circle(frame, (STOP_X_LEFT - 30, H_ROAD_Y2 + 30), 15, color_h, -1)
-        
-        # Overlay Text
-        cv2.putText(frame, "Smart Traffic AI | VIKAS IGU Meerpur", (WIDTH-450, HEIGHT-30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 1)
+        canvas.draw_lights(current_signal)
         
+        # Overlay Text (caption is part of the background)
         status_text = f"Signal: {current_signal}"
         if current_signal == "Horizontal": status_text += " (V-Queue)"
         else: status_text += " (H-Queue)"
              
-        cv2.putText(frame, status_text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        canvas.draw_text(status_text, (20, 50), 1, (255, 255, 255), 2)
 
+        # The canvas is reused next frame, so the writer takes a copy
         out.write(frame)
 
     out.release()
     print("Done.")
 
 if __name__ == "__main__":
-    generate()
+    parser = argparse.ArgumentParser(description="Generate the traffic simulation video.")
+    parser.add_argument("--engine", choices=["objects", "vector"], default="objects")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--headless", action="store_true",
+                        help="Skip drawing/encoding; print throughput metrics as JSON")
+    parser.add_argument("--runs", type=int, default=1, help="Headless: number of seeds to run")
+    parser.add_argument("--frames", type=int, default=TOTAL_FRAMES)
+    parser.add_argument("--controller", choices=list(CONTROLLERS), default=None,
+                        help="Signal controller for the vector engine and headless runs (default: greedy)")
+    parser.add_argument("--encoder", choices=["cv2", "ffmpeg"], default="cv2",
+                        help="ffmpeg pipes raw frames to an external x264 encoder")
+    args = parser.parse_args()
+
+    if args.headless:
+        first = args.seed if args.seed is not None else 0
+        for seed in range(first, first + args.runs):
+            print(json.dumps(run_headless(seed, args.frames, controller=args.controller or "greedy")))
+    else:
+        generate(args.engine, args.seed, args.controller, args.encoder)
@@ -0,0 +1,266 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+# Ensure src modules import correctly when run as a script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.detection import LABEL_CODES, REFERENCE_SIZE, TrafficDetector
+from src.roi import DEFAULT_ROI
+from src.signal_logic import CONGESTION_LEVELS, SIGNALS, congestion_level, decide_direction
+
+SIGNAL_CODES = {name: code for code, name in enumerate(SIGNALS)}
+CONGESTION_CODES = {name: code for code, name in enumerate(CONGESTION_LEVELS)}
+
+
+# ------------------------------------------------
+# PER-FRAME ANALYSIS (same logic as the dashboard, no UI)
+# ------------------------------------------------
+class FrameAnalyzer:
+    """
+    Detection + lane counting + signal / congestion decision for one stream.
+    Rows accumulate in columnar lists and are returned as typed NumPy arrays.
+    """
+
+    def __init__(self, process_size=REFERENCE_SIZE, roi=DEFAULT_ROI):
+        self.roi = roi
+        self.detector = TrafficDetector(process_size=process_size, output_size=REFERENCE_SIZE, roi=roi)
+        self.columns = {
+            "frame": [], "count_h": [], "count_v": [], "detections": [],
+            "ambulance": [], "signal": [], "congestion": [],
+        }
+
+    def warm_up(self, frame):
+        """Feed the background model without recording a row."""
+        self.detector.prepare(frame)
+        self.detector.subtract()
+
+    def process(self, index, frame):
+        detections, _ = self.detector.detect_array(frame, annotate=False)
+        count_h, count_v = self.roi.count_lanes(detections, *REFERENCE_SIZE)
+        amb_detected = bool((detections["label"] == LABEL_CODES["ambulance"]).any())
+
+        c = self.columns
+        c["frame"].append(index)
+        c["count_h"].append(count_h)
+        c["count_v"].append(count_v)
+        c["detections"].append(len(detections))
+        c["ambulance"].append(amb_detected)
+        c["signal"].append(SIGNAL_CODES[decide_direction(count_h, count_v, amb_detected)])
+        c["congestion"].append(CONGESTION_CODES[congestion_level(count_h + count_v)])
+
+    def result(self, fps):
+        c = self.columns
+        frame = np.asarray(c["frame"], dtype=np.uint32)
+        return {
+            "frame": frame,
+            "timestamp": (frame / fps).astype(np.float32),
+            "count_h": np.asarray(c["count_h"], dtype=np.uint16),
+            "count_v": np.asarray(c["count_v"], dtype=np.uint16),
+            "detections": np.asarray(c["detections"], dtype=np.uint16),
+            "ambulance": np.asarray(c["ambulance"], dtype=np.bool_),
+            "signal": np.asarray(c["signal"], dtype=np.uint8),
+            "congestion": np.asarray(c["congestion"], dtype=np.uint8),
+        }
+
+
+def output_paths(video_paths, output_dir):
+    """One .npz per video, named after the file (suffixed if names collide)."""
+    outputs = {}
+    used = set()
+    for path in video_paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        candidate, n = name, 1
+        while candidate in used:
+            candidate = f"{name}_{n}"
+            n += 1
+        used.add(candidate)
+        outputs[path] = os.path.join(output_dir, f"{candidate}.npz")
+    return outputs
+
+
+def save_columns(path, columns, fps, source):
+    """Compact columnar file: one typed array per column (np.load to read back)."""
+    np.savez_compressed(
+        path, fps=np.float32(fps), source=np.str_(source),
+        signal_names=np.array(SIGNALS), congestion_names=np.array(CONGESTION_LEVELS),
+        **columns
+    )
+
+
+def merge_columns(parts):
+    """Concatenate per-segment column dicts (already in frame order)."""
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+# ------------------------------------------------
+# SEGMENTS: one file split into independently processed time ranges
+# ------------------------------------------------
+def plan_segments(total_frames, segments, warmup):
+    """
+    Split [0, total_frames) into `segments` ranges. Each range starts its
+    background model `warmup` frames early so boundaries stay consistent.
+    Returns a list of (warm_start, start, end).
+    """
+    segments = max(1, min(segments, total_frames or 1))
+    bounds = np.linspace(0, total_frames, segments + 1).astype(int)
+    return [
+        (max(0, int(start) - warmup), int(start), int(end))
+        for start, end in zip(bounds[:-1], bounds[1:])
+        if end > start
+    ]
+
+
+def analyze_segment(path, warm_start=0, start=0, end=None, process_size=REFERENCE_SIZE,
+                    single_thread_cv=True):
+    """
+    Analyse frames [start, end) of one file (end=None: until EOF) after
+    warming the background model up on [warm_start, start).
+    Returns (columns, summary).
+    """
+    if single_thread_cv:
+        # Parallelism comes from the process pool, not OpenCV's thread pool
+        cv2.setNumThreads(1)
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None, {"source": path, "error": f"Could not open video source: {path}"}
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    if warm_start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+
+    analyzer = FrameAnalyzer(process_size)
+    begin = time.perf_counter()
+    index = warm_start
+    while end is None or index < end:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index < start:
+            analyzer.warm_up(frame)
+        else:
+            analyzer.process(index, frame)
+        index += 1
+    cap.release()
+    seconds = time.perf_counter() - begin
+
+    frames = max(0, index - start)
+    return analyzer.result(fps), {"source": path, "fps_source": fps, "frames": frames, "seconds": seconds}
+
+
+def frame_count(path):
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    cap.release()
+    return total
+
+
+# ------------------------------------------------
+# BATCH RUNNER: files (and optionally segments) sharded across a process pool
+# ------------------------------------------------
+def analyze_many(paths, output_dir, processes=None, process_size=REFERENCE_SIZE,
+                 segments=1, warmup=500):
+    """
+    Analyse every file; with segments > 1 each file is split into time
+    segments that run in parallel and are merged back in frame order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Biggest files first so the pool doesn't finish on one long straggler
+    paths = sorted(paths, key=lambda p: os.path.getsize(p) if os.path.exists(p) else 0, reverse=True)
+    outputs = output_paths(paths, output_dir)
+
+    jobs = []
+    for p in paths:
+        total = frame_count(p) if segments > 1 else 0
+        if total > 0:
+            for warm_start, start, end in plan_segments(total, segments, warmup):
+                jobs.append((p, warm_start, start, end))
+        else:
+            jobs.append((p, 0, 0, None))
+
+    if processes is None:
+        processes = min(len(jobs), os.cpu_count() or 1)
+
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(analyze_segment, p, ws, s, e, process_size, processes > 1)
+            for p, ws, s, e in jobs
+        ]
+
+        # Wall-clock from pool start until each file's last segment is done
+        # (segments may queue behind others, so their own runtimes don't add up)
+        file_of = {future: p for (p, _, _, _), future in zip(jobs, futures)}
+        done_by_file = {p: started for p in paths}
+        for future in as_completed(futures):
+            done_by_file[file_of[future]] = time.perf_counter()
+
+        # Collect per file, in submission (= frame) order
+        by_file = {p: [] for p in paths}
+        for (p, _, _, _), future in zip(jobs, futures):
+            by_file[p].append(future.result())
+
+    for p in paths:
+        parts = by_file[p]
+        errors = [summary for _, summary in parts if "error" in summary]
+        if errors:
+            print(f"❌ {errors[0]['error']}")
+            results.append(errors[0])
+            continue
+
+        columns = merge_columns([c for c, _ in parts])
+        fps = parts[0][1]["fps_source"]
+        frames = sum(summary["frames"] for _, summary in parts)
+        seconds = done_by_file[p] - started
+        save_columns(outputs[p], columns, fps, p)
+
+        r = {
+            "source": p, "output": outputs[p], "frames": frames, "segments": len(parts),
+            "seconds": seconds, "fps": frames / seconds if seconds > 0 else 0.0,
+            "realtime_factor": (frames / fps) / seconds if seconds > 0 else 0.0,
+        }
+        results.append(r)
+        print(f"✅ {r['source']}: {r['frames']} frames in {r['segments']} segment(s) at {r['fps']:.1f} fps "
+              f"({r['realtime_factor']:.1f}x real time) -> {r['output']}")
+    return results
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless traffic analysis of recorded video.")
+    parser.add_argument("videos", nargs="+", help="Video files to analyse")
+    parser.add_argument("--out", default="results", help="Directory for the .npz result files")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--process-size", type=parse_size, default=REFERENCE_SIZE)
+    parser.add_argument("--segments", type=int, default=1,
+                        help="Split each video into this many time segments processed in parallel")
+    parser.add_argument("--warmup", type=int, default=500,
+                        help="Frames each segment feeds the background model before its start")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = analyze_many(
+        args.videos, args.out, args.processes, args.process_size, args.segments, args.warmup
+    )
+    wall = time.perf_counter() - start
+
+    total = sum(r.get("frames", 0) for r in results)
+    print(f"Processed {total} frames from {len(results)} files in {wall:.1f}s "
+          f"({total / wall if wall > 0 else 0:.1f} frames/sec)")
+
+
+if __name__ == "__main__":
+    main()
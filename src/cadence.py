@@ -0,0 +1,95 @@
+import numpy as np
+
+from src.detection import DETECTION_DTYPE, LABEL_CODES, to_dicts
+from src.signal_logic import congestion_level
+
+
+# ------------------------------------------------
+# ADAPTIVE CADENCE: full detection only when the scene asks for it
+# ------------------------------------------------
+class AdaptiveDetector:
+    """
+    Wraps a TrafficDetector and decides per frame how much work to do:
+      - the background model is updated every `bg_every` frames
+        (at `learning_rate`, -1 = MOG2's automatic rate)
+      - morphology + contours only run when the foreground fraction moved by
+        more than `change_threshold`, or when the current interval has elapsed
+      - the interval ramps down to `min_interval` as soon as an ambulance or
+        a congestion spike shows up, and relaxes back to `max_interval` one
+        frame at a time while the scene stays calm
+    Between extractions the last detections array itself is returned again
+    (same object), so consumers such as VehicleTracker can tell repeats apart.
+    """
+
+    def __init__(self, detector, min_interval=1, max_interval=10, bg_every=1,
+                 learning_rate=-1, change_threshold=0.002, spike_delta=5):
+        self.detector = detector
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.bg_every = max(1, bg_every)
+        self.learning_rate = learning_rate
+        self.change_threshold = change_threshold
+        self.spike_delta = spike_delta
+
+        self.interval = min_interval
+        self.frames = 0
+        self.extractions = 0
+        self._since_extract = 0
+        self._last_fraction = None
+        self._last_detections = np.empty(0, dtype=DETECTION_DTYPE)
+
+    @property
+    def frame(self):
+        return self.detector.frame
+
+    @property
+    def extraction_rate(self):
+        """Share of frames that paid for full contour extraction."""
+        return self.extractions / float(self.frames) if self.frames else 0.0
+
+    def _is_hot(self, detections):
+        if (detections["label"] == LABEL_CODES["ambulance"]).any():
+            return True
+        if congestion_level(len(detections)) == "High":
+            return True
+        return len(detections) - len(self._last_detections) >= self.spike_delta
+
+    def _should_extract(self, fraction):
+        if self._last_fraction is None or self._since_extract >= self.interval:
+            return True
+        return abs(fraction - self._last_fraction) > self.change_threshold
+
+    def detect_array(self, frame, annotate=True):
+        """Same contract as TrafficDetector.detect_array()."""
+        self.frames += 1
+        self._since_extract += 1
+        detections = self._last_detections
+
+        if annotate or self.frames % self.bg_every == 0:
+            self.detector.prepare(frame)
+
+        if self.frames % self.bg_every == 0:
+            fraction = self.detector.subtract(self.learning_rate)
+
+            if self._should_extract(fraction):
+                detections = self.detector.extract()
+                self.extractions += 1
+
+                # Ramp up on emergencies / congestion, otherwise relax slowly
+                if self._is_hot(detections):
+                    self.interval = self.min_interval
+                else:
+                    self.interval = min(self.max_interval, self.interval + 1)
+
+                self._since_extract = 0
+                self._last_fraction = fraction
+                self._last_detections = detections
+
+        if not annotate:
+            return detections, None
+
+        return detections, self.detector.render(detections)
+
+    def detect(self, frame, annotate=True):
+        detections, output = self.detect_array(frame, annotate)
+        return to_dicts(detections), output
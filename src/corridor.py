@@ -0,0 +1,353 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ensure src modules import correctly when run as a script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from generate_simulation import AMBULANCE, FPS, TYPE_SIZE, TYPE_SPEED
+
+# Axis codes (also the value of `green` at a junction; -1 = all red)
+AXIS_H, AXIS_V = 0, 1
+ALL_RED = -1
+POLICIES = ("greedy", "fixed", "green_wave", "coordinated")
+
+ROAD_WIDTH = 80
+REGULAR_TYPES = np.array([t for t in range(len(TYPE_SIZE)) if t != AMBULANCE])
+
+
+# ------------------------------------------------
+# NETWORK: R x C grid, one straight line per row / column and direction
+# ------------------------------------------------
+class CorridorSim:
+    """
+    Headless grid of rows x cols intersections (rows=1 is a corridor).
+
+    Every row and column is a street with one lane per direction; a vehicle
+    is a (line, position) pair where position is its front's distance from
+    the line's entry. Junctions sit every `block` px along each line, so
+    moving along a line is what hands a vehicle from one intersection to
+    the next; with `turn_prob` it switches to the crossing street instead.
+    All vehicles and all junction signals update as NumPy arrays per step.
+
+    Signals are decide_direction-style per junction (green to the axis with
+    more vehicles approaching, ties to Horizontal), optionally biased towards
+    a green-wave timing plan whose offsets follow `progression_speed`:
+
+    - greedy: demand only, held for at least `min_green`
+    - fixed: common cycle, no offsets
+    - green_wave: common cycle, offsets along rows and columns
+    - coordinated: demand plus `wave_bias` vehicles for the wave's axis
+    """
+
+    def __init__(self, rows=1, cols=10, block=300, seed=None, spawn_rate=0.05, turn_prob=0.1,
+                 policy="coordinated", cycle=30.0, split=0.5, progression_speed=6.0, wave_bias=3,
+                 min_green=5.0, clearance=2.0, zone=150, decision_interval=10, fps=FPS,
+                 capacity=1024):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}' (choose from {', '.join(POLICIES)})")
+        self.rows, self.cols, self.block = rows, cols, block
+        self.rng = np.random.default_rng(seed)
+        self.spawn_rate = spawn_rate
+        self.turn_prob = turn_prob
+        self.policy = policy
+        self.cycle = cycle * fps
+        self.split = split
+        self.wave_bias = wave_bias
+        self.min_green = min_green * fps
+        self.clearance = clearance * fps
+        self.zone = zone
+        self.decision_interval = decision_interval
+        self.fps = fps
+        self.frame = 0
+
+        self._build_lines()
+
+        # Junction signal state (j = r * cols + c)
+        n_junctions = rows * cols
+        self.current = np.zeros(n_junctions, dtype=np.int8)
+        self.switched_at = np.full(n_junctions, -self.clearance)
+        self.green = np.zeros(n_junctions, dtype=np.int8)
+        r, c = np.divmod(np.arange(n_junctions), cols)
+        # Green wave: a platoon at progression_speed reaches the next junction
+        # one block later along both rows and columns
+        self.offset = ((r + c) * block / progression_speed) % self.cycle
+
+        self.n = 0
+        self._alloc(capacity)
+        self.reset_stats()
+
+    def _build_lines(self):
+        rows, cols = self.rows, self.cols
+        axis, index, sign = [], [], []
+        for r in range(rows):
+            axis += [AXIS_H, AXIS_H]; index += [r, r]; sign += [1, -1]
+        for c in range(cols):
+            axis += [AXIS_V, AXIS_V]; index += [c, c]; sign += [1, -1]
+        self.line_axis = np.array(axis, dtype=np.int8)
+        self.line_index = np.array(index)
+        self.line_sign = np.array(sign)
+        self.line_junctions = np.where(self.line_axis == AXIS_H, cols, rows)
+        self.line_length = (self.line_junctions + 1) * float(self.block)
+        n_lines = len(axis)
+
+        # junction_of[line, k]: k-th junction met along the line
+        # position_on[line, j]: index of junction j along the line (-1 if not on it)
+        self.junction_of = np.full((n_lines, max(rows, cols)), -1)
+        self.position_on = np.full((n_lines, rows * cols), -1)
+        for line in range(n_lines):
+            m = self.line_junctions[line]
+            k = np.arange(m)
+            along = k if self.line_sign[line] > 0 else m - 1 - k
+            if self.line_axis[line] == AXIS_H:
+                j = self.line_index[line] * cols + along
+            else:
+                j = along * cols + self.line_index[line]
+            self.junction_of[line, :m] = j
+            self.position_on[line, j] = k
+
+        # Crossing lines at each junction, for turns: cross_lines[j] = (line+, line-)
+        r, c = np.divmod(np.arange(rows * cols), cols)
+        h_lines = 2 * r
+        v_lines = 2 * rows + 2 * c
+        self.cross_lines = {AXIS_H: np.stack([v_lines, v_lines + 1], 1),
+                            AXIS_V: np.stack([h_lines, h_lines + 1], 1)}
+
+    # --- STORAGE ---
+    FIELDS = ("line", "s", "speed", "base_speed", "length", "spawned", "waited", "travelled", "stopped")
+
+    def _alloc(self, capacity):
+        old = {f: getattr(self, f) for f in self.FIELDS} if hasattr(self, "s") else None
+        for name in self.FIELDS:
+            dtype = {"line": np.int32, "stopped": np.bool_}.get(name, np.float64)
+            arr = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                arr[:self.n] = old[name][:self.n]
+            setattr(self, name, arr)
+
+    def reset_stats(self):
+        self.spawned_total = 0
+        self.exited = 0
+        self.wait_frames_total = 0.0
+        self.delay_frames_total = 0.0
+        self.stops_total = 0
+        self.turns = 0
+        self.steps = 0
+
+    # --- SPAWNING ---
+    def spawn(self):
+        """Each entry line spawns with `spawn_rate` if its entry is clear."""
+        n_lines = len(self.line_axis)
+        n = self.n
+        tail = np.full(n_lines, np.inf)
+        np.minimum.at(tail, self.line[:n], self.s[:n] - self.length[:n])
+        lines = np.flatnonzero((self.rng.random(n_lines) < self.spawn_rate) & (tail > 60))
+        k = len(lines)
+        if k == 0:
+            return
+        if n + k > len(self.s):
+            self._alloc(max(2 * len(self.s), n + k))
+
+        vtype = self.rng.choice(REGULAR_TYPES, size=k)
+        low, high = TYPE_SPEED[vtype, 0], TYPE_SPEED[vtype, 1]
+        new = slice(n, n + k)
+        self.line[new] = lines
+        self.s[new] = 0.0
+        self.base_speed[new] = low + (high - low) * self.rng.random(k)
+        self.speed[new] = self.base_speed[new]
+        self.length[new] = TYPE_SIZE[vtype, 1]
+        self.spawned[new] = self.frame
+        self.waited[new] = self.travelled[new] = 0
+        self.stopped[new] = False
+        self.n += k
+        self.spawned_total += k
+
+    # --- SIGNALS ---
+    def _next_junction(self, line, s):
+        """Index along the line of the next stop line ahead (committed vehicles skip theirs)."""
+        k = np.ceil((s + ROAD_WIDTH / 2) / self.block - 1).astype(np.intp)
+        np.maximum(k, 0, out=k)
+        valid = k < self.line_junctions[line]
+        j = np.where(valid, self.junction_of[line, np.minimum(k, self.junction_of.shape[1] - 1)], -1)
+        return k, j, valid
+
+    def decide(self, line, s, k, j, valid):
+        """Vectorized decide_direction over every junction, plus the timing plan."""
+        n_junctions = self.rows * self.cols
+        t = self.frame
+
+        stop = (k + 1) * self.block - ROAD_WIDTH / 2
+        near = valid & (stop - s < self.zone)
+        demand = np.bincount(
+            j[near] * 2 + self.line_axis[line[near]], minlength=2 * n_junctions
+        ).reshape(n_junctions, 2).astype(np.float64)
+
+        offset = self.offset if self.policy in ("green_wave", "coordinated") else np.zeros(n_junctions)
+        wave = np.where((t - offset) % self.cycle < self.split * self.cycle, AXIS_H, AXIS_V)
+
+        if self.policy in ("fixed", "green_wave"):
+            desired = wave
+            may_switch = np.ones(n_junctions, dtype=bool)
+        else:
+            if self.policy == "coordinated":
+                demand[np.arange(n_junctions), wave] += self.wave_bias
+            desired = np.where(demand[:, AXIS_H] >= demand[:, AXIS_V], AXIS_H, AXIS_V)
+            may_switch = t - self.switched_at >= self.min_green
+
+        switch = (desired != self.current) & may_switch
+        self.current[switch] = desired[switch]
+        self.switched_at[switch] = t
+
+    # --- PHYSICS ---
+    def step(self):
+        n = self.n
+        line, s, speed, base = self.line[:n], self.s[:n], self.speed[:n], self.base_speed[:n]
+        k, j, valid = self._next_junction(line, s)
+
+        if self.frame % self.decision_interval == 0:
+            self.decide(line, s, k, j, valid)
+        # All red for `clearance` frames after every switch
+        self.green[:] = np.where(self.frame - self.switched_at < self.clearance, ALL_RED, self.current)
+
+        # Leader = next vehicle ahead on the same line
+        order = np.lexsort((s, line))
+        gap_sorted = np.full(n, 9999.0)
+        if n > 1:
+            same = line[order][1:] == line[order][:-1]
+            lead_tail = s[order][1:] - self.length[:n][order][1:]
+            gap_sorted[:-1] = np.where(same, lead_tail - s[order][:-1], 9999.0)
+        min_dist = np.empty(n)
+        min_dist[order] = gap_sorted
+
+        # Stop line of the next junction when its light is red for this axis
+        axis = self.line_axis[line]
+        red = valid & (self.green[np.maximum(j, 0)] != axis)
+        dist_to_stop = np.where(red, (k + 1) * self.block - ROAD_WIDTH / 2 - s, 9999.0)
+
+        # Target speed (same rules as TrafficSim)
+        safe_dist = 40
+        target = base.copy()
+        target[min_dist < safe_dist * 2] = base[min_dist < safe_dist * 2] * 0.5
+        target[min_dist < safe_dist] = 0
+        approaching = (dist_to_stop < 150) & (dist_to_stop > 0)
+        target[approaching] = np.minimum(target[approaching], dist_to_stop[approaching] / 10)
+        target[dist_to_stop <= 5] = 0
+
+        speed += np.where(speed < target, 0.3, np.where(speed > target, -0.5, 0.0))
+        np.maximum(speed, 0, out=speed)
+
+        # Move; vehicles crossing a junction centre may turn onto the crossing street
+        centre = (k + 1) * float(self.block)
+        before = s.copy()
+        s += speed
+        crossed = valid & (before < centre) & (s >= centre)
+        turning = np.flatnonzero(crossed & (self.rng.random(n) < self.turn_prob))
+        if len(turning):
+            jt = j[turning]
+            options = np.where((axis[turning] == AXIS_H)[:, None],
+                               self.cross_lines[AXIS_H][jt], self.cross_lines[AXIS_V][jt])
+            new_line = options[np.arange(len(turning)), self.rng.integers(2, size=len(turning))]
+            new_centre = (self.position_on[new_line, jt] + 1) * float(self.block)
+            s[turning] = new_centre + (s[turning] - centre[turning])
+            line[turning] = new_line
+            self.turns += len(turning)
+
+        stopped = speed < 0.5
+        self.stops_total += int((stopped & ~self.stopped[:n]).sum())
+        self.stopped[:n] = stopped
+        self.waited[:n] += stopped
+        self.travelled[:n] += speed
+        self.steps += 1
+        self.frame += 1
+
+        gone = s > self.line_length[line]
+        if gone.any():
+            self._record_exits(gone)
+            keep = np.flatnonzero(~gone)
+            for name in self.FIELDS:
+                arr = getattr(self, name)
+                arr[:len(keep)] = arr[:n][keep]
+            self.n = len(keep)
+
+    def _record_exits(self, gone):
+        n = self.n
+        lifetime = self.frame - self.spawned[:n][gone]
+        free_flow = self.travelled[:n][gone] / self.base_speed[:n][gone]
+        self.exited += int(gone.sum())
+        self.wait_frames_total += float(self.waited[:n][gone].sum())
+        self.delay_frames_total += float(np.maximum(lifetime - free_flow, 0).sum())
+
+    def stats(self):
+        """Network-wide metrics (times in seconds); vehicles still inside count with their totals so far."""
+        fps = float(self.fps)
+        n = self.n
+        seconds = self.steps / fps
+        lifetime = self.frame - self.spawned[:n]
+        delay = np.maximum(lifetime - self.travelled[:n] / self.base_speed[:n], 0)
+        vehicles = max(self.exited + n, 1)
+        return {
+            "intersections": self.rows * self.cols,
+            "policy": self.policy,
+            "frames": self.steps,
+            "sim_seconds": seconds,
+            "spawned": self.spawned_total,
+            "exited": self.exited,
+            "in_network": n,
+            "turns": self.turns,
+            "throughput_per_hour": self.exited * 3600.0 / seconds if seconds else 0.0,
+            "avg_wait_s": (self.wait_frames_total + float(self.waited[:n].sum())) / vehicles / fps,
+            "avg_delay_s": (self.delay_frames_total + float(delay.sum())) / vehicles / fps,
+            "stops_per_vehicle": self.stops_total / float(vehicles),
+        }
+
+
+def run_corridor(frames=FPS * 120, **params):
+    sim = CorridorSim(**params)
+    start = time.perf_counter()
+    peak = 0
+    for _ in range(frames):
+        sim.spawn()
+        sim.step()
+        peak = max(peak, sim.n)
+    wall = time.perf_counter() - start
+
+    result = sim.stats()
+    result["peak_vehicles"] = peak
+    result["wall_seconds"] = wall
+    result["steps_per_sec"] = frames / wall if wall > 0 else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-intersection corridor / grid simulation.")
+    parser.add_argument("--rows", type=int, default=1)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--block", type=int, default=300, help="Distance between intersections (px)")
+    parser.add_argument("--frames", type=int, default=FPS * 120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn-rate", type=float, default=0.05, help="Spawn probability per entry per frame")
+    parser.add_argument("--turn-prob", type=float, default=0.1)
+    parser.add_argument("--policy", default=",".join(POLICIES), help="Comma-separated policies to compare")
+    parser.add_argument("--cycle", type=float, default=30.0, help="Timing-plan cycle (seconds)")
+    parser.add_argument("--progression-speed", type=float, default=6.0, help="Green-wave speed (px/frame)")
+    parser.add_argument("--wave-bias", type=float, default=3)
+    args = parser.parse_args()
+
+    print(f"{'policy':>12}{'veh/h':>10}{'wait s':>9}{'delay s':>9}{'stops':>7}{'peak veh':>10}{'steps/s':>9}")
+    for policy in args.policy.split(","):
+        r = run_corridor(
+            args.frames, rows=args.rows, cols=args.cols, block=args.block, seed=args.seed,
+            spawn_rate=args.spawn_rate, turn_prob=args.turn_prob, policy=policy, cycle=args.cycle,
+            progression_speed=args.progression_speed, wave_bias=args.wave_bias,
+        )
+        print(f"{policy:>12}{r['throughput_per_hour']:>10.0f}{r['avg_wait_s']:>9.2f}{r['avg_delay_s']:>9.2f}"
+              f"{r['stops_per_vehicle']:>7.2f}{r['peak_vehicles']:>10}{r['steps_per_sec']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
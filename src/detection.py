@@ -1,81 +1,362 @@
 import cv2
 import numpy as np
 
-# --- GLOBAL OBJECTS (reuse between frames) ---
-bg_subtractor = cv2.createBackgroundSubtractorMOG2(
-    history=500, varThreshold=40, detectShadows=True
-)
-kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+# Standard size for stability. Area thresholds below are tuned at this size.
+REFERENCE_SIZE = (960, 540)
 
-# ------------------------------------------------
-# MAIN FUNCTION: detect_traffic(frame)
-# ------------------------------------------------
-def detect_traffic(frame):
-    """
-    Simple motion-based vehicle detection using background subtraction.
-    No YOLO, no internet needed.
-    Returns:
-      - counts: dict of estimated vehicle counts
-      - output: frame with rectangles drawn
-    """
-    # Standard size for stability
-    frame_resized = cv2.resize(frame, (960, 540))
+# Noise floor, then motorcycle / car / truck upper bounds (pixels at REFERENCE_SIZE)
+MIN_AREA = 800
+AREA_THRESHOLDS = (2000, 6000, 12000)
 
-    # 1) Background subtraction
-    fg_mask = bg_subtractor.apply(frame_resized)
+BOX_COLOR = (0, 255, 0)
 
-    # 2) Threshold to keep strong motion only
-    _, fg_mask = cv2.threshold(fg_mask, 200, 255, cv2.THRESH_BINARY)
+# Label codes used by the columnar detection arrays.
+# "ambulance" is never produced by area classification but keeps a code for callers.
+LABELS = ("motorcycle", "car", "truck", "bus", "ambulance")
+LABEL_CODES = {name: code for code, name in enumerate(LABELS)}
 
-    # 3) Remove noise + fill gaps
-    fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel, iterations=1)
-    fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_DILATE, kernel, iterations=2)
+# One row per detection (see detect_array)
+DETECTION_DTYPE = np.dtype([
+    ("x", np.int32), ("y", np.int32), ("w", np.int32), ("h", np.int32),
+    ("area", np.float64), ("label", np.uint8),
+])
 
-    # 4) Contours = moving objects
-    contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    # Vehicle objects list
-    detected_objects = []
+# ------------------------------------------------
+# COLUMNAR HELPERS
+# ------------------------------------------------
+def classify_areas(areas, thresholds=AREA_THRESHOLDS):
+    """Vectorized area -> label code (motorcycle / car / truck / bus)."""
+    return np.searchsorted(np.asarray(thresholds), areas, side="right").astype(np.uint8)
 
-    output = frame_resized.copy()
 
-    for cnt in contours:
-        area = cv2.contourArea(cnt)
+def to_dicts(detections):
+    """Compatibility shim: structured detection array -> list of dicts."""
+    return [
+        {"label": LABELS[label], "x": x, "y": y, "w": w, "h": h, "area": area}
+        for x, y, w, h, area, label in zip(
+            detections["x"].tolist(), detections["y"].tolist(),
+            detections["w"].tolist(), detections["h"].tolist(),
+            detections["area"].tolist(), detections["label"].tolist(),
+        )
+    ]
 
-        # Ignore small noise
-        if area < 800:
-            continue
 
-        x, y, w, h = cv2.boundingRect(cnt)
+def from_dicts(detected_objects):
+    """Compatibility shim: list of dicts -> structured detection array."""
+    detections = np.empty(len(detected_objects), dtype=DETECTION_DTYPE)
+    for i, obj in enumerate(detected_objects):
+        detections[i] = (
+            obj["x"], obj["y"], obj["w"], obj["h"], obj["area"], LABEL_CODES[obj["label"]]
+        )
+    return detections
 
-        # Rough classification based on area size
-        if area < 2000:
-            label = "motorcycle"
-        elif area < 6000:
-            label = "car"
-        elif area < 12000:
-            label = "truck"
-        else:
-            label = "bus"
 
-        # Store object data
-        detected_objects.append({
-            "label": label,
-            "x": x, "y": y, "w": w, "h": h,
-            "area": area
-        })
+# ------------------------------------------------
+# OVERLAY STAGE: only paid when someone is watching
+# ------------------------------------------------
+def draw_detections(frame, detections, out=None):
+    """
+    Draw boxes + labels for detections (structured array or list of dicts).
+    Draws on a copy of `frame` (or into the preallocated `out` buffer).
+    """
+    if out is None:
+        out = frame.copy()
+    elif out is not frame:
+        np.copyto(out, frame)
+
+    if not isinstance(detections, np.ndarray):
+        detections = from_dicts(detections)
 
-        # Draw box + label on frame
-        cv2.rectangle(output, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    for x, y, w, h, label in zip(
+        detections["x"].tolist(), detections["y"].tolist(),
+        detections["w"].tolist(), detections["h"].tolist(), detections["label"].tolist(),
+    ):
+        cv2.rectangle(out, (x, y), (x + w, y + h), BOX_COLOR, 2)
         cv2.putText(
-            output,
-            label,
+            out,
+            LABELS[label],
             (x, y - 5),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.5,
-            (0, 255, 0),
+            BOX_COLOR,
             1,
             cv2.LINE_AA,
         )
 
-    return detected_objects, output
+    return out
+
+
+# ------------------------------------------------
+# DETECTOR: one instance per video stream
+# ------------------------------------------------
+class _Region:
+    """One independently processed tile: its own MOG2 model and mask buffers."""
+
+    def __init__(self, rect, history, var_threshold, detect_shadows, road_mask=None):
+        self.x, self.y, self.w, self.h = rect
+        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=history, varThreshold=var_threshold, detectShadows=detect_shadows
+        )
+        self.fg_mask = np.empty((self.h, self.w), dtype=np.uint8)
+        self.mask = np.empty((self.h, self.w), dtype=np.uint8)
+        # Only needed when the road polygon cuts through the tile
+        self.road_mask = road_mask
+
+
+class TrafficDetector:
+    """
+    Motion-based vehicle detector that owns its own background model.
+    Create one per camera / video stream so streams never share MOG2 state.
+    Resize and mask buffers are allocated once and reused across frames.
+
+    process_size: resolution MOG2 / morphology / contours run at.
+    output_size: coordinate space boxes are reported in (None = source frame).
+    roi: optional RoadROI; only its road tiles are processed, each on its own.
+    metrics: optional metrics.Metrics; per-stage timers are skipped when None.
+    """
+
+    def __init__(self, history=500, var_threshold=40, detect_shadows=True,
+                 process_size=REFERENCE_SIZE, output_size=REFERENCE_SIZE, roi=None,
+                 metrics=None):
+        self.process_size = tuple(process_size)
+        self.output_size = tuple(output_size) if output_size is not None else None
+        self.roi = roi
+        self.metrics = metrics
+
+        # Kernel and area thresholds scale with the processing resolution
+        w, h = self.process_size
+        scale_x = w / REFERENCE_SIZE[0]
+        scale_area = (w * h) / (REFERENCE_SIZE[0] * REFERENCE_SIZE[1])
+        ksize = max(1, int(round(5 * scale_x))) | 1
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (ksize, ksize))
+        self.min_area = MIN_AREA * scale_area
+        self.area_thresholds = tuple(t * scale_area for t in AREA_THRESHOLDS)
+
+        # --- REUSABLE BUFFERS ---
+        self._resized = np.empty((h, w, 3), dtype=np.uint8)
+        self._source = None
+        self._source_size = self.process_size
+
+        if roi is None:
+            self.regions = [_Region((0, 0, w, h), history, var_threshold, detect_shadows)]
+        else:
+            road = roi.mask(w, h) if roi.polygon is not None else None
+            self.regions = []
+            for tx, ty, tw, th in roi.tiles(w, h):
+                tile_mask = None
+                if road is not None:
+                    tile_mask = road[ty:ty + th, tx:tx + tw].copy()
+                    if not tile_mask.any():
+                        continue
+                self.regions.append(
+                    _Region((tx, ty, tw, th), history, var_threshold, detect_shadows, tile_mask)
+                )
+            if not self.regions:
+                raise ValueError("ROI does not cover any part of the frame")
+
+    @property
+    def frame(self):
+        """Last processed (resized) frame. Overwritten by the next detect() call."""
+        return self._resized
+
+    def _output_scale(self):
+        out_w, out_h = self.output_size or self._source_size
+        return out_w / self.process_size[0], out_h / self.process_size[1]
+
+    # --- STAGES (detect_array runs them in order; AdaptiveDetector mixes them) ---
+    def prepare(self, frame):
+        """Resize the frame into the processing buffer."""
+        m = self.metrics
+        if m is not None:
+            t0 = m.now()
+
+        self._source = frame
+        self._source_size = (frame.shape[1], frame.shape[0])
+        cv2.resize(frame, self.process_size, dst=self._resized)
+
+        if m is not None:
+            m.observe_stage("resize", m.now() - t0)
+            m.inc("frames")
+
+    def subtract(self, learning_rate=-1):
+        """
+        Update the background models with the prepared frame and threshold
+        the foreground. Returns the fraction of processed pixels in motion.
+        """
+        m = self.metrics
+        t_mog2 = t_threshold = 0.0
+        moving = 0
+        total = 0
+        for region in self.regions:
+            tile = self._resized[region.y:region.y + region.h, region.x:region.x + region.w]
+            if m is not None:
+                t0 = m.now()
+
+            # 1) Background subtraction
+            region.bg_subtractor.apply(tile, fgmask=region.fg_mask, learningRate=learning_rate)
+
+            if m is not None:
+                t1 = m.now()
+                t_mog2 += t1 - t0
+
+            # 2) Threshold to keep strong motion only
+            cv2.threshold(region.fg_mask, 200, 255, cv2.THRESH_BINARY, dst=region.mask)
+            if region.road_mask is not None:
+                cv2.bitwise_and(region.mask, region.road_mask, dst=region.mask)
+
+            moving += cv2.countNonZero(region.mask)
+            total += region.w * region.h
+
+            if m is not None:
+                t_threshold += m.now() - t1
+
+        if m is not None:
+            m.observe_stage("mog2", t_mog2)
+            m.observe_stage("threshold", t_threshold)
+
+        return moving / float(total) if total else 0.0
+
+    def extract(self):
+        """Turn the thresholded masks from subtract() into a detection array."""
+        m = self.metrics
+        t_morph = t_contours = t_measure = 0.0
+        parts = []
+        for region in self.regions:
+            if m is not None:
+                t0 = m.now()
+
+            # 3) Remove noise + fill gaps
+            cv2.morphologyEx(region.mask, cv2.MORPH_OPEN, self.kernel, dst=region.fg_mask, iterations=1)
+            cv2.morphologyEx(region.fg_mask, cv2.MORPH_DILATE, self.kernel, dst=region.mask, iterations=2)
+
+            if m is not None:
+                t1 = m.now()
+
+            # 4) Contours = moving objects (in full-frame coordinates)
+            contours, _ = cv2.findContours(
+                region.mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(region.x, region.y)
+            )
+
+            if m is not None:
+                t2 = m.now()
+
+            parts.append(self._measure(contours))
+
+            if m is not None:
+                t_morph += t1 - t0
+                t_contours += t2 - t1
+                t_measure += m.now() - t2
+
+        if m is not None:
+            t_merge = m.now()
+        detections = parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+        # Rough classification based on area size
+        detections["label"] = classify_areas(detections["area"], self.area_thresholds)
+
+        # Back-projection from processing to output coordinates
+        sx, sy = self._output_scale()
+        if sx != 1.0 or sy != 1.0:
+            for field, scale in (("x", sx), ("y", sy), ("w", sx), ("h", sy)):
+                detections[field] = np.rint(detections[field] * scale)
+            detections["area"] *= sx * sy
+
+        if m is not None:
+            m.observe_stage("morphology", t_morph)
+            m.observe_stage("contours", t_contours)
+            m.observe_stage("classification", t_measure + (m.now() - t_merge))
+            m.observe("detections_per_frame", len(detections))
+
+        return detections
+
+    def _measure(self, contours):
+        """Contours -> structured array in processing coordinates (noise removed)."""
+        if not contours:
+            return np.empty(0, dtype=DETECTION_DTYPE)
+
+        rects = np.array([cv2.boundingRect(cnt) for cnt in contours], dtype=np.int32)
+
+        # A contour never covers more than its bounding box, so most noise
+        # is dropped here without computing its area
+        candidates = np.flatnonzero(rects[:, 2] * rects[:, 3] >= self.min_area)
+        areas = np.array([cv2.contourArea(contours[i]) for i in candidates], dtype=np.float64)
+
+        # Ignore small noise
+        keep = areas >= self.min_area
+        rects = rects[candidates[keep]]
+        areas = areas[keep]
+
+        detections = np.empty(len(areas), dtype=DETECTION_DTYPE)
+        detections["x"], detections["y"] = rects[:, 0], rects[:, 1]
+        detections["w"], detections["h"] = rects[:, 2], rects[:, 3]
+        detections["area"] = areas
+        return detections
+
+    def render(self, detections):
+        """Annotated copy of the prepared frame in output coordinates."""
+        m = self.metrics
+        if m is not None:
+            t0 = m.now()
+
+        if self.output_size == self.process_size:
+            output = draw_detections(self._resized, detections)
+        elif self.output_size is None:
+            output = draw_detections(self._source, detections)
+        else:
+            output = cv2.resize(self._source, self.output_size)
+            draw_detections(output, detections, out=output)
+
+        if m is not None:
+            m.observe_stage("annotate", m.now() - t0)
+        return output
+
+    def detect_array(self, frame, annotate=True):
+        """
+        Columnar variant of detect().
+        Returns:
+          - detections: DETECTION_DTYPE array (x, y, w, h, area, label code) in output coordinates
+          - output: frame with rectangles drawn, or None when annotate=False
+        """
+        self.prepare(frame)
+        self.subtract()
+        detections = self.extract()
+
+        if not annotate:
+            return detections, None
+
+        return detections, self.render(detections)
+
+    def detect(self, frame, annotate=True):
+        """
+        Simple motion-based vehicle detection using background subtraction.
+        No YOLO, no internet needed.
+        Returns:
+          - detected_objects: list of dicts (label, x, y, w, h, area) in output coordinates
+          - output: frame with rectangles drawn, or None when annotate=False
+        """
+        detections, output = self.detect_array(frame, annotate)
+        return to_dicts(detections), output
+
+
+# --- DEFAULT DETECTOR (single-stream callers like the dashboard) ---
+_default_detector = None
+
+
+def get_default_detector():
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = TrafficDetector()
+    return _default_detector
+
+
+# ------------------------------------------------
+# MAIN FUNCTION: detect_traffic(frame)
+# ------------------------------------------------
+def detect_traffic(frame, annotate=True):
+    """
+    Run the shared default detector on one frame.
+    Only safe for a single stream per process; use TrafficDetector for more.
+    Pass annotate=False in headless runs to skip the copy + drawing.
+    """
+    return get_default_detector().detect(frame, annotate)
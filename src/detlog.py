@@ -0,0 +1,214 @@
+import argparse
+import os
+import struct
+import sys
+
+import numpy as np
+
+# Ensure src modules import correctly when run as a script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.detection import LABELS
+from src.roi import LANE_H, LANE_NONE, LANE_V
+from src.signal_logic import SIGNALS
+
+# ------------------------------------------------
+# FORMAT: 64-byte header + fixed-size little-endian records
+# ------------------------------------------------
+MAGIC = b"STDETLOG"
+VERSION = 1
+HEADER = struct.Struct("<8sII48x")  # magic, version, record size
+
+LOG_DTYPE = np.dtype([
+    ("frame", "<u4"),
+    ("timestamp", "<f8"),  # seconds since the epoch
+    ("stream", "<u2"),
+    ("x", "<i2"), ("y", "<i2"), ("w", "<i2"), ("h", "<i2"),
+    ("area", "<f4"),
+    ("label", "u1"),
+    ("lane", "u1"),
+    ("signal", "u1"),
+    ("reserved", "u1"),
+])
+
+# Label code of the placeholder row written for frames without detections,
+# so every frame's signal decision is on record
+NO_OBJECT = 255
+
+SIGNAL_CODES = {name: code for code, name in enumerate(SIGNALS)}
+LANE_NAMES = {LANE_NONE: "none", LANE_H: "H", LANE_V: "V"}
+
+
+def _check_header(raw, path):
+    magic, version, record_size = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a detection log")
+    if version != VERSION or record_size != LOG_DTYPE.itemsize:
+        raise ValueError(f"{path}: unsupported log version {version} (record size {record_size})")
+
+
+# ------------------------------------------------
+# WRITER: append-only, batched flushes
+# ------------------------------------------------
+class DetectionLogWriter:
+    """
+    Appends detection rows to a log file. Rows collect in a preallocated
+    record buffer and are written in one call every `batch_size` rows.
+    """
+
+    def __init__(self, path, stream_id=0, batch_size=4096):
+        self.path = path
+        self.stream_id = stream_id
+        self._buffer = np.zeros(batch_size, dtype=LOG_DTYPE)
+        self._pending = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        header = HEADER.pack(MAGIC, VERSION, LOG_DTYPE.itemsize)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size >= HEADER.size:
+            with open(path, "rb") as f:
+                _check_header(f.read(HEADER.size), path)
+            # Drop a partially written trailing record (e.g. after a crash),
+            # otherwise every row appended after it would be misaligned
+            keep = HEADER.size + (size - HEADER.size) // LOG_DTYPE.itemsize * LOG_DTYPE.itemsize
+        else:
+            if size:
+                with open(path, "rb") as f:
+                    if not header.startswith(f.read()):
+                        raise ValueError(f"{path} is not a detection log")
+            keep = 0  # empty file or torn header: start over
+
+        self._file = open(path, "ab")
+        if keep < size:
+            self._file.truncate(keep)
+        if keep == 0:
+            self._file.write(header)
+
+    def write_frame(self, frame, timestamp, detections, lanes, signal):
+        """
+        Record one frame: a row per detection (DETECTION_DTYPE array),
+        or a single NO_OBJECT row when nothing was detected.
+        """
+        n = max(len(detections), 1)
+        if self._pending + n > len(self._buffer):
+            self.flush()
+        if n > len(self._buffer):
+            self._buffer = np.zeros(n, dtype=LOG_DTYPE)
+
+        rows = self._buffer[self._pending:self._pending + n]
+        rows["frame"] = frame
+        rows["timestamp"] = timestamp
+        rows["stream"] = self.stream_id
+        rows["signal"] = SIGNAL_CODES[signal] if isinstance(signal, str) else signal
+
+        if len(detections):
+            for field in ("x", "y", "w", "h", "area", "label"):
+                rows[field] = detections[field]
+            rows["lane"] = lanes
+        else:
+            rows[["x", "y", "w", "h"]] = (0, 0, 0, 0)
+            rows["area"] = 0
+            rows["label"] = NO_OBJECT
+            rows["lane"] = LANE_NONE
+
+        self._pending += n
+
+    def flush(self):
+        if self._pending:
+            self._file.write(self._buffer[:self._pending].tobytes())
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------------------------------------
+# READER: memory-mapped, zero-copy NumPy views
+# ------------------------------------------------
+class DetectionLogReader:
+    """
+    Memory-maps a log. `records` is a read-only structured view of the file;
+    slicing it never copies. Rows are assumed to be appended in time order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            _check_header(f.read(HEADER.size), path)
+
+        # Ignore a partially written trailing record
+        count = (os.path.getsize(path) - HEADER.size) // LOG_DTYPE.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=LOG_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=LOG_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def time_range(self, start=None, end=None):
+        """View of the rows with start <= timestamp < end (binary search, no scan)."""
+        ts = self.records["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="left"))
+        return self.records[lo:hi]
+
+    def detections(self, start=None, end=None, stream=None):
+        rows = self.time_range(start, end)
+        keep = rows["label"] != NO_OBJECT
+        if stream is not None:
+            keep &= rows["stream"] == stream
+        return rows[keep]
+
+    def counts_per_lane(self, bucket_seconds=60, start=None, end=None, stream=None):
+        """
+        Detection counts per time bucket and lane.
+        Returns (bucket_start_times, counts) with counts shaped (buckets, 3 lanes).
+        """
+        rows = self.detections(start, end, stream)
+        if not len(rows):
+            return np.empty(0), np.zeros((0, 3), dtype=np.int64)
+
+        bucket = (rows["timestamp"] // bucket_seconds).astype(np.int64)
+        first = bucket.min()
+        n_buckets = int(bucket.max() - first) + 1
+        flat = (bucket - first) * 3 + rows["lane"]
+        counts = np.bincount(flat, minlength=n_buckets * 3).reshape(n_buckets, 3)
+        starts = (first + np.arange(n_buckets)) * float(bucket_seconds)
+        return starts, counts
+
+    def label_counts(self, start=None, end=None, stream=None):
+        rows = self.detections(start, end, stream)
+        counts = np.bincount(rows["label"], minlength=len(LABELS))
+        return {name: int(counts[code]) for code, name in enumerate(LABELS)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a binary detection log.")
+    parser.add_argument("log")
+    parser.add_argument("--bucket", type=float, default=60.0, help="Bucket size in seconds")
+    parser.add_argument("--stream", type=int, default=None)
+    args = parser.parse_args()
+
+    reader = DetectionLogReader(args.log)
+    print(f"{len(reader)} records")
+    print("Labels:", reader.label_counts(stream=args.stream))
+
+    starts, counts = reader.counts_per_lane(args.bucket, stream=args.stream)
+    print(f"{'bucket start':>14} {'H':>7} {'V':>7} {'none':>7}")
+    for t, row in zip(starts, counts):
+        print(f"{t:>14.0f} {row[LANE_H]:>7} {row[LANE_V]:>7} {row[LANE_NONE]:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import asyncio
+import collections
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.websocket import WebSocketConnection, read_request, upgrade
+
+# Event types
+FRAME = "frame"
+SIGNAL_CHANGED = "signal_changed"
+EMERGENCY_START = "emergency_start"
+EMERGENCY_END = "emergency_end"
+CONGESTION_CHANGED = "congestion_changed"
+
+# Drop policies for a full subscriber queue
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+class Event:
+    __slots__ = ("seq", "type", "time", "data")
+
+    def __init__(self, seq, type, time, data):
+        self.seq = seq
+        self.type = type
+        self.time = time
+        self.data = data
+
+    def to_dict(self):
+        return {"seq": self.seq, "type": self.type, "time": self.time, **self.data}
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+
+# ------------------------------------------------
+# SUBSCRIPTIONS: bounded per-sink queue + drop policy
+# ------------------------------------------------
+class Subscription:
+    """
+    Queue between the bus and one sink. When full, frame events are
+    evicted before state-change events, so a slow sink loses per-frame
+    detail rather than signal / emergency / congestion transitions.
+    """
+
+    def __init__(self, sink, types=None, maxsize=256, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy '{policy}'")
+        self.sink = sink
+        self.types = frozenset(types) if types else None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.delivered = 0
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._ready = None  # asyncio.Event, created on the bus loop
+        self._closing = False
+
+    def offer(self, event):
+        """Called on the bus loop; never blocks."""
+        if self.types is not None and event.type not in self.types:
+            return
+        q = self._queue
+        if len(q) >= self.maxsize:
+            self.dropped += 1
+            oldest_frame = next((e for e in q if e.type == FRAME), None)
+            if oldest_frame is None:
+                # Only state changes queued: a frame never displaces one
+                if event.type == FRAME or self.policy == DROP_NEWEST:
+                    return
+                q.popleft()
+            elif event.type == FRAME and self.policy == DROP_NEWEST:
+                return
+            else:
+                q.remove(oldest_frame)
+        q.append(event)
+        self._ready.set()
+
+    async def run(self):
+        if hasattr(self.sink, "open"):
+            await self.sink.open()
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._queue:
+                    event = self._queue.popleft()
+                    try:
+                        await self.sink.handle(event)
+                        self.delivered += 1
+                    except Exception as e:
+                        print(f"Event sink error ({type(self.sink).__name__}): {e}")
+                if self._closing:
+                    return
+        finally:
+            if hasattr(self.sink, "close"):
+                await self.sink.close()
+
+    def stats(self):
+        return {"sink": type(self.sink).__name__, "queued": len(self._queue),
+                "delivered": self.delivered, "dropped": self.dropped}
+
+
+# ------------------------------------------------
+# EVENT BUS: asyncio loop on its own thread
+# ------------------------------------------------
+class EventBus:
+    """
+    In-process publish/subscribe. publish() may be called from any thread
+    and only schedules a callback on the bus loop, so the detection loop
+    never waits on a sink; each sink drains its own Subscription.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.published = 0
+        self._subs = []
+        self._tasks = []
+        self._seq = itertools.count()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def subscribe(self, sink, types=None, maxsize=256, policy=DROP_OLDEST):
+        sub = Subscription(sink, types, maxsize, policy)
+
+        def _attach():
+            sub._ready = asyncio.Event()
+            self._subs.append(sub)
+            self._tasks.append(self.loop.create_task(sub.run()))
+
+        self.loop.call_soon_threadsafe(_attach)
+        return sub
+
+    def publish(self, type, **data):
+        if self.loop.is_closed():
+            return
+        event = Event(next(self._seq), type, time.time(), data)
+        self.published += 1
+        self.loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event):
+        for sub in self._subs:
+            sub.offer(event)
+
+    def stats(self):
+        return {"published": self.published, "subscribers": [s.stats() for s in self._subs]}
+
+    def close(self, timeout=5.0):
+        """Deliver what is queued, close every sink and stop the loop."""
+        async def _shutdown():
+            for sub in self._subs:
+                sub._closing = True
+                sub._ready.set()
+            await asyncio.wait_for(asyncio.gather(*self._tasks, return_exceptions=True), timeout)
+
+        if self.loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self.loop).result(timeout + 1)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+# ------------------------------------------------
+# PUBLISHER: per-frame state -> frame + transition events
+# ------------------------------------------------
+class DetectionEvents:
+    """Publishes a FRAME event per call plus events for the state changes since the last one."""
+
+    def __init__(self, bus, stream="default"):
+        self.bus = bus
+        self.stream = stream
+        self.signal = None
+        self.emergency = False
+        self.congestion = None
+
+    def frame(self, frame_index, count_h, count_v, detections, ambulance, signal, congestion, **extra):
+        bus, stream = self.bus, self.stream
+        bus.publish(FRAME, stream=stream, frame=frame_index, count_h=count_h, count_v=count_v,
+                    detections=detections, ambulance=ambulance, signal=signal, congestion=congestion,
+                    **extra)
+        if signal != self.signal:
+            bus.publish(SIGNAL_CHANGED, stream=stream, frame=frame_index, previous=self.signal, signal=signal,
+                        count_h=count_h, count_v=count_v)
+            self.signal = signal
+        if ambulance != self.emergency:
+            bus.publish(EMERGENCY_START if ambulance else EMERGENCY_END, stream=stream, frame=frame_index)
+            self.emergency = ambulance
+        if congestion != self.congestion:
+            bus.publish(CONGESTION_CHANGED, stream=stream, frame=frame_index, previous=self.congestion,
+                        congestion=congestion)
+            self.congestion = congestion
+
+
+# ------------------------------------------------
+# SINKS: async handle(event), optional open() / close()
+# ------------------------------------------------
+class CallbackSink:
+    """Runs a plain function per event on the bus thread (keep it quick)."""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    async def handle(self, event):
+        self.fn(event)
+
+
+class JsonlFileSink:
+    """Appends one JSON object per line; flushes every `flush_every` events."""
+
+    def __init__(self, path, flush_every=50):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = None
+        self._count = 0
+
+    async def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "a")
+
+    async def handle(self, event):
+        self._file.write(event.to_json() + "\n")
+        self._count += 1
+        if self._count % self.flush_every == 0:
+            self._file.flush()
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class SqliteSink:
+    """
+    events(seq, time, type, stream, data) table. Rows are inserted on the bus
+    loop and committed in batches on a worker thread.
+    """
+
+    def __init__(self, path, commit_every=200, commit_interval=1.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.conn = None
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    async def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "seq INTEGER, time REAL, type TEXT, stream TEXT, data TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS events_time ON events (time)")
+        self.conn.commit()
+
+    async def handle(self, event):
+        self.conn.execute(
+            "INSERT INTO events VALUES (?, ?, ?, ?, ?)",
+            (event.seq, event.time, event.type, event.data.get("stream"), json.dumps(event.data)),
+        )
+        self._pending += 1
+        now = time.monotonic()
+        if self._pending >= self.commit_every or now - self._last_commit >= self.commit_interval:
+            self._pending = 0
+            self._last_commit = now
+            await asyncio.to_thread(self.conn.commit)
+
+    async def close(self):
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+
+
+class WebSocketSink:
+    """
+    Serves ws://host:port/ and broadcasts every event as JSON. Each client
+    has its own bounded queue, so one slow client never holds up another.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, client_queue=64):
+        self.host = host
+        self.port = port
+        self.client_queue = client_queue
+        self.clients = set()
+        self._server = None
+
+    async def open(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+
+    async def _serve(self, reader, writer):
+        request = await read_request(reader)
+        if request is None:
+            writer.close()
+            return
+        try:
+            await upgrade(writer, request[2])
+        except ValueError:
+            writer.write(b"HTTP/1.1 426 Upgrade Required\r\nContent-Length: 0\r\n\r\n")
+            writer.close()
+            return
+        client = WebSocketConnection(reader, writer, self.client_queue)
+        self.clients.add(client)
+        try:
+            await client.run()
+        finally:
+            self.clients.discard(client)
+
+    async def handle(self, event):
+        if self.clients:
+            text = event.to_json()
+            for client in list(self.clients):
+                client.send(text)
+
+    async def close(self):
+        for client in list(self.clients):
+            client.writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
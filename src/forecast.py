@@ -0,0 +1,124 @@
+import numpy as np
+
+# Lanes per intersection in the forecaster's series layout (see series_index)
+LANES = ("Horizontal", "Vertical")
+
+
+def series_index(intersection, lane):
+    """Position of (intersection, lane) in a forecaster shared by many junctions."""
+    return intersection * len(LANES) + LANES.index(lane)
+
+
+# ------------------------------------------------
+# FORECASTER: damped-trend Holt + time-of-day profile, all series at once
+# ------------------------------------------------
+class DemandForecaster:
+    """
+    Exponential smoothing for `n_series` demand series (e.g. two lanes per
+    intersection) held in flat NumPy arrays, so one update or forecast is
+    a handful of vector operations whatever the number of series.
+
+    Updates may arrive at any rate: the smoothing constants are defined per
+    `step` seconds and rescaled by the time since each series' last update,
+    and the trend is kept in vehicles per second. With `season_slots` > 0
+    an additive profile over a `season_seconds` cycle (a day by default) is
+    learned as well; keep `alpha` small then, or the level absorbs the cycle.
+    """
+
+    def __init__(self, n_series=2, step=1.0, alpha=0.2, beta=0.02, phi=0.98,
+                 season_slots=0, season_seconds=86400.0, gamma=0.05):
+        self.n_series = n_series
+        self.step = step
+        self.alpha = alpha
+        self.beta = beta
+        self.phi = phi
+        self.gamma = gamma
+        self.season_seconds = season_seconds
+        self.slot_seconds = season_seconds / season_slots if season_slots else None
+
+        self.level = np.zeros(n_series)
+        self.trend = np.zeros(n_series)
+        self.last = np.full(n_series, np.nan)  # time of last update; NaN = never seen
+        self.season = np.zeros((n_series, season_slots)) if season_slots else None
+
+    def _slot(self, t):
+        return (np.asarray(t) // self.slot_seconds).astype(np.int64) % self.season.shape[1]
+
+    def _rate(self, constant, dt):
+        # Same smoothing per unit time however often updates arrive
+        return 1.0 - (1.0 - constant) ** (dt / self.step)
+
+    def update(self, values, now, index=None):
+        """
+        Fold in one observation per series at time `now` (seconds). `index`
+        selects which series `values` belong to (default: all); NaN values
+        are treated as missing.
+        """
+        idx = np.arange(self.n_series) if index is None else np.atleast_1d(index)
+        x = np.asarray(values, dtype=np.float64).reshape(len(idx))
+        seen = ~np.isnan(x)
+        idx, x = idx[seen], x[seen]
+
+        season = 0.0
+        if self.season is not None:
+            slot = self._slot(now)
+            season = self.season[idx, slot]
+
+        last = self.last[idx]
+        first = np.isnan(last)
+        dt = np.where(first, self.step, np.maximum(now - last, 1e-6))
+
+        level, trend = self.level[idx], self.trend[idx]
+        a, b = self._rate(self.alpha, dt), self._rate(self.beta, dt)
+        damp = self.phi ** (dt / self.step)
+        predicted = level + trend * dt * damp
+        new_level = np.where(first, x - season, predicted + a * (x - season - predicted))
+        new_trend = np.where(first, 0.0, damp * trend + b * ((new_level - level) / dt - damp * trend))
+
+        self.level[idx] = new_level
+        self.trend[idx] = new_trend
+        self.last[idx] = now
+        if self.season is not None:
+            g = self._rate(self.gamma, dt)
+            self.season[idx, slot] = season + np.where(first, 0.0, g * (x - new_level - season))
+
+    def forecast(self, horizon, now=None, index=None):
+        """
+        Expected demand `horizon` seconds after `now` (default: each series'
+        last update) for the selected series, never below zero.
+        """
+        idx = np.arange(self.n_series) if index is None else np.atleast_1d(index)
+        last = self.last[idx]
+        base = np.where(np.isnan(last), 0.0, last)
+        t = base + horizon if now is None else now + horizon
+        h = np.maximum(t - base, 0.0) / self.step
+
+        # Damped trend: sum of phi^i for i = 1..h steps, in closed form
+        if self.phi < 1.0:
+            reach = self.phi * (1.0 - self.phi ** h) / (1.0 - self.phi)
+        else:
+            reach = h
+        value = self.level[idx] + self.trend[idx] * self.step * reach
+        if self.season is not None:
+            value = value + self.season[idx, self._slot(t)]
+        return np.maximum(value, 0.0)
+
+    def replay(self, times, values, index=None):
+        """Warm up from history: `values` has one row per time in `times`."""
+        for t, row in zip(times, values):
+            self.update(row, t, index)
+
+
+def warm_start(forecaster, history, stream="default", intersection=0, resolution="minute", start=None):
+    """
+    Seed one intersection's lanes in `forecaster` from a history.RollingAggregator
+    (mean counts per bucket, timestamped at the bucket's middle).
+    """
+    from src.history import RESOLUTION_SECONDS  # history -> signal_logic -> forecast
+
+    series = history.series(resolution, start, stream=stream)
+    times = series["time"] + RESOLUTION_SECONDS[resolution] / 2
+    values = np.column_stack([series["mean_h"], series["mean_v"]])
+    index = [series_index(intersection, lane) for lane in LANES]
+    forecaster.replay(times, values, index)
+    return len(times)
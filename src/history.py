@@ -0,0 +1,295 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Ensure src modules import correctly when run as a script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.signal_logic import CONGESTION_LEVELS
+
+# (name, bucket seconds, buckets kept in memory)
+RESOLUTIONS = (
+    ("second", 1, 3600),      # last hour
+    ("minute", 60, 24 * 60),  # last day
+    ("hour", 3600, 90 * 24),  # last 90 days
+)
+RESOLUTION_SECONDS = {name: seconds for name, seconds, _ in RESOLUTIONS}
+
+BUCKET_DTYPE = np.dtype([
+    ("key", "<i8"),          # bucket start // bucket seconds
+    ("samples", "<u4"),      # frames aggregated
+    ("sum_h", "<f8"), ("sum_v", "<f8"),
+    ("max_h", "<u4"), ("max_v", "<u4"),
+    ("congestion", "<u4", (len(CONGESTION_LEVELS),)),  # frames per level
+    ("ambulance", "<u4"),    # frames with an ambulance
+])
+
+CONGESTION_INDEX = {name: i for i, name in enumerate(CONGESTION_LEVELS)}
+
+
+# ------------------------------------------------
+# RING: fixed number of buckets at one resolution
+# ------------------------------------------------
+class _Ring:
+    """Bucket k lives in slot k % length; a slot is reset when a newer bucket claims it."""
+
+    def __init__(self, seconds, length):
+        self.seconds = seconds
+        self.buckets = np.zeros(length, dtype=BUCKET_DTYPE)
+        self.buckets["key"] = -1
+
+    def merge(self, key, row):
+        i = key % len(self.buckets)
+        if self.buckets["key"][i] != key:
+            self.buckets[i] = row
+            self.buckets["key"][i] = key
+            return
+        slot = self.buckets[i]
+        slot["samples"] += row["samples"]
+        slot["sum_h"] += row["sum_h"]
+        slot["sum_v"] += row["sum_v"]
+        slot["max_h"] = max(slot["max_h"], row["max_h"])
+        slot["max_v"] = max(slot["max_v"], row["max_v"])
+        slot["congestion"] += row["congestion"]
+        slot["ambulance"] += row["ambulance"]
+
+    def range(self, start_key, end_key):
+        """Buckets with start_key <= key < end_key, oldest first."""
+        b = self.buckets
+        rows = b[(b["key"] >= start_key) & (b["key"] < end_key) & (b["samples"] > 0)]
+        return rows[np.argsort(rows["key"])]
+
+
+class _StreamHistory:
+    def __init__(self):
+        self.rings = {name: _Ring(seconds, length) for name, seconds, length in RESOLUTIONS}
+        self.second = None
+        # Open second as plain scalars: samples, sum_h, sum_v, max_h, max_v, ambulance, *congestion
+        self.acc = [0] * (6 + len(CONGESTION_LEVELS))
+        self.closed_keys = {name: None for name, _, _ in RESOLUTIONS}
+
+
+# ------------------------------------------------
+# AGGREGATOR
+# ------------------------------------------------
+class RollingAggregator:
+    """
+    Downsamples per-frame lane counts into per-second, per-minute and
+    per-hour buckets for each stream. Frames accumulate in Python scalars for
+    the current second; when the second ends it is merged into all three rings.
+    Memory is fixed per stream (see RESOLUTIONS).
+
+    With `db_path`, finished minute and hour buckets are written to SQLite
+    (batched every `flush_interval` seconds), and queries older than the
+    rings fall back to the database.
+    """
+
+    def __init__(self, db_path=None, persist=("minute", "hour"), flush_interval=30.0):
+        self.db_path = db_path
+        self.persist = tuple(persist)
+        self.flush_interval = flush_interval
+        self.streams = {}
+        self._lock = threading.Lock()
+        self._pending_rows = []
+        self._last_flush = time.monotonic()
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "stream TEXT, resolution TEXT, start REAL, samples INTEGER, sum_h REAL, sum_v REAL, "
+                "max_h INTEGER, max_v INTEGER, low INTEGER, medium INTEGER, high INTEGER, ambulance INTEGER, "
+                "PRIMARY KEY (stream, resolution, start))"
+            )
+            self._db.commit()
+
+    def add(self, timestamp, count_h, count_v, congestion=None, ambulance=False, stream="default"):
+        """Record one frame (timestamp in epoch seconds)."""
+        second = int(timestamp)
+        with self._lock:
+            history = self.streams.get(stream)
+            if history is None:
+                history = self.streams[stream] = _StreamHistory()
+            if history.second != second:
+                if history.second is not None:
+                    self._close_second(stream, history)
+                history.second = second
+                history.acc = [0] * len(history.acc)
+
+            acc = history.acc
+            acc[0] += 1
+            acc[1] += count_h
+            acc[2] += count_v
+            if count_h > acc[3]:
+                acc[3] = count_h
+            if count_v > acc[4]:
+                acc[4] = count_v
+            if ambulance:
+                acc[5] += 1
+            if congestion is not None:
+                acc[6 + CONGESTION_INDEX[congestion]] += 1
+
+        if self._db is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _close_second(self, stream, history):
+        row = _open_row(history)
+        for name, seconds, _ in RESOLUTIONS:
+            key = history.second // seconds
+            history.rings[name].merge(key, row)
+            # A coarser bucket is final once a later second lands in a new one
+            previous = history.closed_keys[name]
+            if name in self.persist and previous is not None and previous != key:
+                self._queue_row(stream, name, history.rings[name], previous)
+            history.closed_keys[name] = key
+
+    def _queue_row(self, stream, name, ring, key):
+        if self._db is None:
+            return
+        slot = ring.buckets[key % len(ring.buckets)]
+        if slot["key"] != key or slot["samples"] == 0:
+            return
+        low, medium, high = (int(c) for c in slot["congestion"])
+        self._pending_rows.append((
+            stream, name, float(key * ring.seconds), int(slot["samples"]), float(slot["sum_h"]),
+            float(slot["sum_v"]), int(slot["max_h"]), int(slot["max_v"]), low, medium, high,
+            int(slot["ambulance"]),
+        ))
+
+    def flush(self, close_open=False):
+        """Write finished buckets to SQLite (close_open: also the open second / minute / hour)."""
+        with self._lock:
+            if close_open:
+                for stream, history in self.streams.items():
+                    if history.second is None:
+                        continue
+                    self._close_second(stream, history)
+                    history.second = None
+                    for name in self.persist:
+                        ring = history.rings[name]
+                        self._queue_row(stream, name, ring, history.closed_keys[name])
+            rows, self._pending_rows = self._pending_rows, []
+            self._last_flush = time.monotonic()
+            if self._db is not None and rows:
+                self._db.executemany("INSERT OR REPLACE INTO buckets VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+                self._db.commit()
+
+    def close(self):
+        self.flush(close_open=True)
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # --- QUERIES ---
+    def query(self, resolution="minute", start=None, end=None, stream="default"):
+        """
+        Buckets overlapping [start, end) as a BUCKET_DTYPE array, oldest
+        first. In-memory buckets win; older ones come from SQLite.
+        """
+        seconds = RESOLUTION_SECONDS[resolution]
+        end = time.time() + seconds if end is None else end
+        start = 0 if start is None else start
+        start_key, end_key = int(start // seconds), int(-(-end // seconds))
+
+        with self._lock:
+            history = self.streams.get(stream)
+            rows = history.rings[resolution].range(start_key, end_key) if history else np.zeros(0, BUCKET_DTYPE)
+            # Include the second that is still accumulating
+            if history is not None and history.second is not None:
+                key = history.second // seconds
+                if start_key <= key < end_key:
+                    open_row = _open_row(history)
+                    open_row["key"] = key
+                    rows = _merge_rows(rows, open_row[None])
+
+            if self._db is not None and resolution in self.persist:
+                # Plain int: sqlite3 binds NumPy integers as blobs, which compare above every number
+                oldest = int(rows["key"][0]) if len(rows) else end_key
+                if start_key < oldest:
+                    rows = np.concatenate([self._query_db(stream, resolution, seconds, start_key, oldest), rows])
+        return rows
+
+    def _query_db(self, stream, resolution, seconds, start_key, end_key):
+        cur = self._db.execute(
+            "SELECT start, samples, sum_h, sum_v, max_h, max_v, low, medium, high, ambulance FROM buckets "
+            "WHERE stream = ? AND resolution = ? AND start >= ? AND start < ? ORDER BY start",
+            (stream, resolution, start_key * seconds, end_key * seconds),
+        )
+        data = cur.fetchall()
+        rows = np.zeros(len(data), dtype=BUCKET_DTYPE)
+        if data:
+            a = np.array(data, dtype=np.float64)
+            rows["key"] = (a[:, 0] // seconds).astype(np.int64)
+            rows["samples"], rows["sum_h"], rows["sum_v"] = a[:, 1], a[:, 2], a[:, 3]
+            rows["max_h"], rows["max_v"] = a[:, 4], a[:, 5]
+            rows["congestion"] = a[:, 6:9]
+            rows["ambulance"] = a[:, 9]
+        return rows
+
+    def series(self, resolution="minute", start=None, end=None, stream="default"):
+        """Columns for charts/reports: bucket start times, mean/max counts, share of High congestion."""
+        rows = self.query(resolution, start, end, stream)
+        samples = np.maximum(rows["samples"], 1).astype(np.float64)
+        return {
+            "time": rows["key"] * float(RESOLUTION_SECONDS[resolution]),
+            "mean_h": rows["sum_h"] / samples,
+            "mean_v": rows["sum_v"] / samples,
+            "max_h": rows["max_h"],
+            "max_v": rows["max_v"],
+            "high_share": rows["congestion"][:, CONGESTION_INDEX["High"]] / samples,
+            "ambulance_frames": rows["ambulance"],
+        }
+
+
+def _open_row(history):
+    acc = history.acc
+    row = np.zeros((), dtype=BUCKET_DTYPE)
+    row["samples"], row["sum_h"], row["sum_v"], row["max_h"], row["max_v"], row["ambulance"] = acc[:6]
+    row["congestion"] = acc[6:]
+    return row
+
+
+def _merge_rows(rows, extra):
+    """Add `extra` buckets into `rows` (matching keys are combined)."""
+    out = rows.copy()
+    for row in extra:
+        match = np.flatnonzero(out["key"] == row["key"])
+        if len(match):
+            target = out[match[0]]
+            for field in ("samples", "sum_h", "sum_v", "congestion", "ambulance"):
+                target[field] += row[field]
+            target["max_h"] = max(target["max_h"], row["max_h"])
+            target["max_v"] = max(target["max_v"], row["max_v"])
+        else:
+            out = np.concatenate([out, row[None]])
+    return out[np.argsort(out["key"])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report lane-count history from a history database.")
+    parser.add_argument("db")
+    parser.add_argument("--stream", default="default")
+    parser.add_argument("--resolution", choices=["minute", "hour"], default="minute")
+    parser.add_argument("--since", type=float, default=3600.0, help="Seconds of history to show")
+    args = parser.parse_args()
+
+    history = RollingAggregator(args.db)
+    s = history.series(args.resolution, time.time() - args.since, None, args.stream)
+    print(f"{'bucket start':>20} {'mean H':>8} {'mean V':>8} {'max H':>6} {'max V':>6} {'High %':>7} {'amb':>5}")
+    for i in range(len(s["time"])):
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(s["time"][i]))
+        print(f"{stamp:>20} {s['mean_h'][i]:>8.1f} {s['mean_v'][i]:>8.1f} {s['max_h'][i]:>6} "
+              f"{s['max_v'][i]:>6} {100 * s['high_share'][i]:>6.0f}% {s['ambulance_frames'][i]:>5}")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
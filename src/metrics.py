@@ -0,0 +1,162 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets (seconds) for stage timers
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Detections-per-frame buckets
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+PREFIX = "smart_traffic"
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+# ------------------------------------------------
+# METRICS REGISTRY
+# ------------------------------------------------
+class Metrics:
+    """
+    Opt-in counters, gauges and histograms for the live system.
+    Hot paths hold `metrics=None` when disabled and skip all timing calls,
+    so a disabled system pays one `is not None` check per stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self.started = time.time()
+
+    # Monotonic clock for stage timers
+    now = staticmethod(time.perf_counter)
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = _Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value, buckets=COUNT_BUCKETS):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = _Histogram(buckets)
+            hist.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_seconds": time.time() - self.started,
+                "stages": {k: h.snapshot() for k, h in self._stages.items()},
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {k: h.snapshot() for k, h in self._histograms.items()},
+            }
+
+    def render_prometheus(self):
+        """Prometheus text exposition format."""
+        lines = []
+
+        def histogram_lines(name, hist, labels=""):
+            cumulative = 0
+            sep = "," if labels else ""
+            for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {hist.sum}")
+            lines.append(f"{name}_count{suffix} {hist.count}")
+
+        with self._lock:
+            name = f"{PREFIX}_stage_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for stage, hist in sorted(self._stages.items()):
+                histogram_lines(name, hist, f'stage="{stage}"')
+
+            for key, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {PREFIX}_{key}_total counter")
+                lines.append(f"{PREFIX}_{key}_total {value}")
+
+            for key, value in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {PREFIX}_{key} gauge")
+                lines.append(f"{PREFIX}_{key} {value}")
+
+            for key, hist in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {PREFIX}_{key} histogram")
+                histogram_lines(f"{PREFIX}_{key}", hist)
+
+        return "\n".join(lines) + "\n"
+
+    # --- EXPORTERS ---
+    def serve(self, port=9108, host="127.0.0.1"):
+        """Serve /metrics (Prometheus text) and /metrics.json on a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(metrics.snapshot()).encode()
+                    ctype = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = metrics.render_prometheus().encode()
+                    ctype = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def dump_json_periodically(self, path, interval=10.0):
+        """Rewrite `path` with a JSON snapshot every `interval` seconds."""
+        stop = threading.Event()
+
+        def _loop():
+            while not stop.wait(interval):
+                with open(path, "w") as f:
+                    json.dump(self.snapshot(), f)
+
+        threading.Thread(target=_loop, daemon=True).start()
+        return stop
@@ -0,0 +1,179 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+# Ensure src modules import correctly when run as a script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.cadence import AdaptiveDetector
+from src.detection import TrafficDetector
+
+
+def parse_source(source):
+    """Camera indices come in as strings from the CLI ("0" -> 0)."""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+def is_live(source):
+    if isinstance(source, int):
+        return True
+    return str(source).startswith(("rtsp://", "http://", "https://"))
+
+
+# ------------------------------------------------
+# CAPTURE THREAD: fills a bounded per-stream queue
+# ------------------------------------------------
+def _capture(cap, frames, stop, live, stats):
+    while not stop.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        if live:
+            # Live cameras never wait on detection: drop the oldest frame
+            try:
+                frames.put_nowait(frame)
+            except queue.Full:
+                try:
+                    frames.get_nowait()
+                    stats["dropped"] += 1
+                except queue.Empty:
+                    pass
+                frames.put_nowait(frame)
+        else:
+            # Files apply back-pressure instead so every frame is processed
+            while not stop.is_set():
+                try:
+                    frames.put(frame, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    # End-of-stream marker
+    while True:
+        try:
+            frames.put(None, timeout=0.1)
+            break
+        except queue.Full:
+            if stop.is_set():
+                break
+
+
+def run_stream(source, queue_size=8, max_frames=None, single_thread_cv=True, adaptive=False):
+    """
+    Process one camera / video source with its own detector.
+    Returns a summary dict for the stream.
+    """
+    if single_thread_cv:
+        # Parallelism comes from the process pool, not OpenCV's thread pool
+        cv2.setNumThreads(1)
+
+    source = parse_source(source)
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        return {"source": source, "error": f"Could not open video source: {source}"}
+
+    detector = TrafficDetector()
+    if adaptive:
+        detector = AdaptiveDetector(detector)
+    frames = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    stats = {"dropped": 0}
+
+    reader = threading.Thread(
+        target=_capture, args=(cap, frames, stop, is_live(source), stats), daemon=True
+    )
+
+    processed = 0
+    detections = 0
+    start = time.perf_counter()
+    reader.start()
+
+    while True:
+        frame = frames.get()
+        if frame is None:
+            break
+
+        objects, _ = detector.detect_array(frame, annotate=False)
+        processed += 1
+        detections += len(objects)
+
+        if max_frames is not None and processed >= max_frames:
+            break
+
+    stop.set()
+    reader.join()
+    cap.release()
+
+    seconds = time.perf_counter() - start
+    return {
+        "source": source,
+        "frames": processed,
+        "detections": detections,
+        "dropped": stats["dropped"],
+        "seconds": seconds,
+        "fps": processed / seconds if seconds > 0 else 0.0,
+    }
+
+
+# ------------------------------------------------
+# MULTI-STREAM RUNNER: N sources across a process pool
+# ------------------------------------------------
+def run_streams(sources, processes=None, queue_size=8, max_frames=None, adaptive=False):
+    """
+    Run every source in its own worker process.
+    Returns (per_stream_results, aggregate_fps).
+    """
+    if processes is None:
+        processes = min(len(sources), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(run_stream, src, queue_size, max_frames, processes > 1, adaptive)
+            for src in sources
+        ]
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - start
+
+    total_frames = sum(r.get("frames", 0) for r in results)
+    aggregate_fps = total_frames / wall if wall > 0 else 0.0
+    return results, aggregate_fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run traffic detection on many streams at once.")
+    parser.add_argument("sources", nargs="+", help="Video files, stream URLs or camera indices")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--adaptive", action="store_true", help="Adaptive detection cadence")
+    args = parser.parse_args()
+
+    results, aggregate_fps = run_streams(
+        args.sources, args.processes, args.queue_size, args.max_frames, args.adaptive
+    )
+
+    for r in results:
+        if "error" in r:
+            print(f"❌ {r['error']}")
+        else:
+            print(
+                f"{r['source']}: {r['frames']} frames, {r['detections']} detections, "
+                f"{r['dropped']} dropped, {r['fps']:.1f} fps"
+            )
+    print(f"Aggregate throughput: {aggregate_fps:.1f} frames/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import collections
+import threading
+import time
+
+import cv2
+
+from src.multi_stream import is_live
+
+
+# ------------------------------------------------
+# FRAME PACING: sleep only as long as the source fps requires
+# ------------------------------------------------
+class FramePacer:
+    """
+    Keeps a loop at `fps` by sleeping until the next frame deadline.
+    If the loop falls behind it does not sleep (and does not burst to catch up).
+    """
+
+    def __init__(self, fps):
+        self.period = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = None
+
+    def wait(self):
+        if self.period == 0.0:
+            return
+        now = time.monotonic()
+        if self._next is None or now - self._next > self.period:
+            # First frame, or we fell more than a frame behind: re-anchor
+            self._next = now + self.period
+            return
+        delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next += self.period
+
+
+def source_fps(cap, default=30.0):
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    return fps if fps and fps > 1 else default
+
+
+# ------------------------------------------------
+# RING BUFFER: bounded, drops the oldest frame when full
+# ------------------------------------------------
+class FrameRing:
+    def __init__(self, size=4, metrics=None):
+        self.metrics = metrics
+        self._frames = collections.deque(maxlen=size)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def put(self, item):
+        """Append an item. Returns True if the oldest one had to be dropped."""
+        with self._cond:
+            dropped = len(self._frames) == self._frames.maxlen
+            if dropped:
+                self.dropped += 1
+            self._frames.append(item)
+            self._cond.notify()
+        return dropped
+
+    def get(self, timeout=None, newest=False):
+        """
+        Oldest buffered item (newest=True: the newest, dropping the rest),
+        or None once closed and drained (or on timeout).
+        """
+        with self._cond:
+            if not self._frames and not self._closed:
+                self._cond.wait(timeout)
+            if not self._frames:
+                return None
+            if newest:
+                item = self._frames.pop()
+                skipped = len(self._frames)
+                self._frames.clear()
+                if skipped:
+                    self.dropped += skipped
+                    if self.metrics is not None:
+                        self.metrics.inc("dropped_frames", skipped)
+                return item
+            return self._frames.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed and not self._frames
+
+
+class DetectionResult:
+    def __init__(self, seq, frame_index, detections, image, captured_at):
+        self.seq = seq
+        self.frame_index = frame_index
+        self.detections = detections
+        self.image = image
+        self.captured_at = captured_at
+
+
+# ------------------------------------------------
+# PIPELINE: capture thread -> ring -> detection thread -> latest result
+# ------------------------------------------------
+class DetectionPipeline:
+    """
+    Decouples decode, detection and UI:
+      - capture thread reads frames (paced to the file fps; live cameras pace themselves)
+      - detection thread takes the newest buffered frame for live sources
+        (older ones are dropped) and every frame in order for files
+      - the UI takes whatever result is newest and never blocks detection
+    """
+
+    def __init__(self, source, detector, ring_size=4, annotate=True, metrics=None):
+        self.source = source
+        self.detector = detector
+        self.annotate = annotate
+        self.metrics = metrics
+        self.ring = FrameRing(ring_size, metrics)
+        self.fps = 30.0
+        # Cameras and network streams: never paced, newest frame first
+        self.live = is_live(source)
+
+        self._cap = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._latest = None
+        self._latest_cond = threading.Condition()
+        self._detection_done = False
+
+    def start(self):
+        """Open the source and start the worker threads. Returns False if it can't be opened."""
+        self._cap = cv2.VideoCapture(self.source)
+        if not self._cap.isOpened():
+            return False
+        self.fps = source_fps(self._cap)
+
+        self._threads = [
+            threading.Thread(target=self._capture_loop, daemon=True),
+            threading.Thread(target=self._detect_loop, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self.ring.close()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        if self._cap is not None:
+            self._cap.release()
+
+    @property
+    def finished(self):
+        return self._detection_done
+
+    def _capture_loop(self):
+        pacer = FramePacer(0 if self.live else self.fps)
+        m = self.metrics
+        index = 0
+        while not self._stop.is_set():
+            if m is not None:
+                t0 = m.now()
+            ret, frame = self._cap.read()
+            if not ret:
+                break
+            dropped = self.ring.put((index, frame, time.monotonic()))
+            if m is not None:
+                m.observe_stage("decode", m.now() - t0)
+                m.set_gauge("queue_depth", len(self.ring))
+                if dropped:
+                    m.inc("dropped_frames")
+            index += 1
+            pacer.wait()
+        self.ring.close()
+
+    def _detect_loop(self):
+        seq = 0
+        while not self._stop.is_set():
+            # Live: stale frames only add latency; files: keep every frame
+            item = self.ring.get(timeout=0.5, newest=self.live)
+            if item is None:
+                if self.ring.closed:
+                    break
+                continue
+
+            index, frame, captured_at = item
+            detections, image = self.detector.detect_array(frame, self.annotate)
+            seq += 1
+
+            with self._latest_cond:
+                self._latest = DetectionResult(seq, index, detections, image, captured_at)
+                self._latest_cond.notify_all()
+
+        with self._latest_cond:
+            self._detection_done = True
+            self._latest_cond.notify_all()
+
+    def latest(self, after_seq=0, timeout=None):
+        """Newest result with seq > after_seq, or None if none arrives in time."""
+        with self._latest_cond:
+            if (self._latest is None or self._latest.seq <= after_seq) and not self._detection_done:
+                self._latest_cond.wait(timeout)
+            if self._latest is not None and self._latest.seq > after_seq:
+                return self._latest
+            return None
+
+    def results(self, poll=0.5):
+        """
+        Yield the newest result each time the consumer asks for one.
+        Results produced while the consumer was busy are skipped, not queued.
+        """
+        seq = 0
+        while True:
+            result = self.latest(seq, timeout=poll)
+            if result is None:
+                if self.finished and (self._latest is None or self._latest.seq <= seq):
+                    return
+                continue
+            if self.metrics is not None and result.seq > seq + 1:
+                self.metrics.inc("stale_results", result.seq - seq - 1)
+            seq = result.seq
+            yield result
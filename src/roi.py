@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+
+# Lane codes for vectorized assignment
+LANE_NONE, LANE_H, LANE_V = 0, 1, 2
+
+
+# ------------------------------------------------
+# ROAD ROI: shared by detection and lane counting
+# ------------------------------------------------
+class RoadROI:
+    """
+    Cross-shaped road region of an intersection.
+    h_band = (y1, y2) and v_band = (x1, x2) are fractions of the frame size.
+    polygon: optional list of (x, y) fractions that further restricts the road.
+    """
+
+    def __init__(self, h_band=(0.35, 0.65), v_band=(0.35, 0.65), polygon=None):
+        self.h_band = tuple(h_band)
+        self.v_band = tuple(v_band)
+        self.polygon = polygon
+
+    def bands(self, width, height):
+        """Pixel bounds (roi_h_y1, roi_h_y2, roi_v_x1, roi_v_x2) for a frame size."""
+        return (
+            int(height * self.h_band[0]), int(height * self.h_band[1]),
+            int(width * self.v_band[0]), int(width * self.v_band[1]),
+        )
+
+    def tiles(self, width, height):
+        """
+        Non-overlapping (x, y, w, h) rectangles covering the cross:
+        the full horizontal band plus the vertical band above and below it.
+        """
+        y1, y2, x1, x2 = self.bands(width, height)
+        tiles = [
+            (0, y1, width, y2 - y1),
+            (x1, 0, x2 - x1, y1),
+            (x1, y2, x2 - x1, height - y2),
+        ]
+        return [t for t in tiles if t[2] > 0 and t[3] > 0]
+
+    def mask(self, width, height):
+        """Full-frame uint8 mask (255 = road) of the cross, clipped to the polygon."""
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for x, y, w, h in self.tiles(width, height):
+            mask[y:y + h, x:x + w] = 255
+
+        if self.polygon is not None:
+            pts = np.array(
+                [(int(px * width), int(py * height)) for px, py in self.polygon], dtype=np.int32
+            )
+            poly_mask = np.zeros_like(mask)
+            cv2.fillPoly(poly_mask, [pts], 255)
+            cv2.bitwise_and(mask, poly_mask, dst=mask)
+
+        return mask
+
+    def pixel_fraction(self, width, height):
+        """Share of frame pixels detection actually has to process."""
+        return sum(w * h for _, _, w, h in self.tiles(width, height)) / float(width * height)
+
+    def lane(self, cx, cy, width, height):
+        """Lane a centroid counts towards: "H", "V" or None (outside the road)."""
+        y1, y2, x1, x2 = self.bands(width, height)
+        if y1 < cy < y2:
+            return "H"
+        if x1 < cx < x2:
+            return "V"
+        return None
+
+    def assign_lanes(self, detections, width, height):
+        """
+        Vectorized lane() over a structured detection array.
+        Returns a uint8 array of LANE_NONE / LANE_H / LANE_V codes.
+        """
+        y1, y2, x1, x2 = self.bands(width, height)
+        cx = detections["x"] + detections["w"] // 2
+        cy = detections["y"] + detections["h"] // 2
+
+        in_h = (cy > y1) & (cy < y2)
+        in_v = (cx > x1) & (cx < x2)
+
+        lanes = np.full(len(detections), LANE_NONE, dtype=np.uint8)
+        lanes[in_v] = LANE_V
+        lanes[in_h] = LANE_H  # horizontal band wins inside the junction box
+        return lanes
+
+    def count_lanes(self, detections, width, height):
+        """(count_h, count_v) for a structured detection array."""
+        counts = np.bincount(self.assign_lanes(detections, width, height), minlength=3)
+        return int(counts[LANE_H]), int(counts[LANE_V])
+
+
+# Central bands the dashboard has always counted in
+DEFAULT_ROI = RoadROI()
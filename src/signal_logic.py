@@ -1,3 +1,10 @@
+from src.forecast import LANES as FORECAST_LANES, DemandForecaster, series_index
+
+# Codes for compact (columnar / binary) storage of decisions
+SIGNALS = ("Horizontal", "Vertical", "Emergency", "Clearance")
+CONGESTION_LEVELS = ("Low", "Medium", "High")
+
+
 def decide_direction(count_h, count_v, ambulance_detected=False):
     if ambulance_detected:
         return "Emergency"
@@ -13,3 +20,228 @@ def congestion_level(total):
         return "Medium"
     else:
         return "Low"
+
+
+# ------------------------------------------------
+# CONTROLLERS: stateful policies behind one interface
+# ------------------------------------------------
+AXES = ("Horizontal", "Vertical")
+
+
+def _other(axis):
+    return "Vertical" if axis == "Horizontal" else "Horizontal"
+
+
+class SignalController:
+    """
+    Base class. update() takes decide_direction's inputs plus a timestamp
+    (seconds) and optional queue estimates (queue_h, queue_v), and returns
+    the signal to show. Subclasses implement choose(); the base class keeps
+    the current phase, when it started and how often it changed.
+    """
+
+    PARAMS = ()
+
+    def __init__(self, start="Horizontal"):
+        self.signal = start
+        self.phase_start = None
+        self.switches = 0
+
+    def elapsed(self, now):
+        return 0.0 if self.phase_start is None else now - self.phase_start
+
+    def update(self, count_h, count_v, ambulance_detected=False, now=0.0, queues=None):
+        if self.phase_start is None:
+            self.phase_start = now
+        signal = self.choose(count_h, count_v, ambulance_detected, now, queues)
+        if signal != self.signal:
+            self.signal = signal
+            self.phase_start = now
+            self.switches += 1
+        return signal
+
+    def choose(self, count_h, count_v, ambulance_detected, now, queues):
+        raise NotImplementedError
+
+    def _axis(self):
+        # Phase to resume after a non-axis state (Emergency / Clearance)
+        return self.signal if self.signal in AXES else "Horizontal"
+
+
+class GreedyController(SignalController):
+    """decide_direction on every call (the original behaviour)."""
+
+    def choose(self, count_h, count_v, ambulance_detected, now, queues):
+        return decide_direction(count_h, count_v, ambulance_detected)
+
+
+class FixedTimeController(SignalController):
+    """Alternates on a fixed cycle; `split` is the horizontal share of it."""
+
+    PARAMS = ("cycle", "split")
+
+    def __init__(self, cycle=40.0, split=0.5):
+        super().__init__()
+        self.cycle = cycle
+        self.split = split
+
+    def choose(self, count_h, count_v, ambulance_detected, now, queues):
+        green = self.cycle * (self.split if self._axis() == "Horizontal" else 1 - self.split)
+        if self.elapsed(now) >= green:
+            return _other(self._axis())
+        return self._axis()
+
+
+class HysteresisController(SignalController):
+    """
+    Holds each green for at least `min_green` seconds and switches only when
+    the other axis has `margin` more vehicles. After `max_green` it yields to
+    any waiting demand, so a busy axis can't starve a quiet one.
+    """
+
+    PARAMS = ("min_green", "max_green", "margin")
+
+    def __init__(self, min_green=5.0, max_green=40.0, margin=2):
+        super().__init__()
+        self.min_green = min_green
+        self.max_green = max_green
+        self.margin = margin
+
+    def demand(self, count_h, count_v, queues):
+        return {"Horizontal": count_h, "Vertical": count_v}
+
+    def choose(self, count_h, count_v, ambulance_detected, now, queues):
+        current = self._axis()
+        other = _other(current)
+        elapsed = self.elapsed(now)
+        if elapsed < self.min_green:
+            return current
+
+        demand = self.demand(count_h, count_v, queues)
+        if elapsed >= self.max_green and demand[other] > 0:
+            return other
+        if demand[other] > demand[current] + self.margin:
+            return other
+        return current
+
+
+class MaxPressureController(HysteresisController):
+    """
+    Serves the axis with the longest queue (stopped vehicles), falling back
+    to lane counts when no queue estimate is available.
+    """
+
+    def __init__(self, min_green=5.0, max_green=60.0, margin=0):
+        super().__init__(min_green, max_green, margin)
+
+    def demand(self, count_h, count_v, queues):
+        if queues is None:
+            return super().demand(count_h, count_v, queues)
+        return {"Horizontal": queues[0], "Vertical": queues[1]}
+
+
+class PredictiveController(HysteresisController):
+    """
+    Hysteresis on a blend of current and forecast demand: each axis counts
+    as (1 - weight) * now + weight * forecast `horizon` seconds ahead, so a
+    green can be handed over before the other queue has built up. Counts
+    are averaged over `step` seconds before reaching the forecaster.
+
+    Pass a shared forecast.DemandForecaster and this junction's number to
+    run many intersections off one set of arrays.
+    """
+
+    PARAMS = HysteresisController.PARAMS + ("horizon", "weight", "step")
+
+    def __init__(self, min_green=5.0, max_green=40.0, margin=2, horizon=30.0, weight=0.5, step=1.0,
+                 forecaster=None, intersection=0):
+        super().__init__(min_green, max_green, margin)
+        self.horizon = horizon
+        self.weight = weight
+        self.step = step
+        self.forecaster = forecaster if forecaster is not None else DemandForecaster(len(FORECAST_LANES), step)
+        self.index = [series_index(intersection, lane) for lane in FORECAST_LANES]
+        self.expected = {axis: 0.0 for axis in AXES}
+        self._sums = [0.0, 0.0, 0]
+        self._window_start = None
+
+    def choose(self, count_h, count_v, ambulance_detected, now, queues):
+        sums = self._sums
+        sums[0] += count_h
+        sums[1] += count_v
+        sums[2] += 1
+        if self._window_start is None:
+            self._window_start = now
+        if now - self._window_start >= self.step:
+            self.forecaster.update([sums[0] / sums[2], sums[1] / sums[2]], now, self.index)
+            expected = self.forecaster.forecast(self.horizon, now, self.index)
+            self.expected = dict(zip(AXES, expected.tolist()))
+            self._sums = [0.0, 0.0, 0]
+            self._window_start = now
+        return super().choose(count_h, count_v, ambulance_detected, now, queues)
+
+    def demand(self, count_h, count_v, queues):
+        w = self.weight
+        return {
+            "Horizontal": (1 - w) * count_h + w * self.expected["Horizontal"],
+            "Vertical": (1 - w) * count_v + w * self.expected["Vertical"],
+        }
+
+
+class EmergencyPreemption(SignalController):
+    """
+    Wraps another controller. An ambulance forces "Emergency" after a
+    `clearance` interval of all-red ("Clearance"); once it has been gone for
+    `hold` seconds the junction clears again and control returns to `inner`.
+    """
+
+    PARAMS = ("clearance", "hold")
+
+    def __init__(self, inner, clearance=2.0, hold=1.0):
+        super().__init__(inner.signal)
+        self.inner = inner
+        self.clearance = clearance
+        self.hold = hold
+        self.last_seen = None
+        self.clear_until = None
+
+    def choose(self, count_h, count_v, ambulance_detected, now, queues):
+        if ambulance_detected:
+            if self.last_seen is None:
+                self.clear_until = now + self.clearance
+            self.last_seen = now
+        elif self.last_seen is not None and now - self.last_seen >= self.hold:
+            self.last_seen = None
+            self.clear_until = now + self.clearance
+            # Restart the inner phase clock on hand-back, so min green counts from there
+            self.inner.phase_start = None
+
+        if self.clear_until is not None and now < self.clear_until:
+            return "Clearance"
+        if self.last_seen is not None:
+            return "Emergency"
+        return self.inner.update(count_h, count_v, False, now, queues)
+
+
+CONTROLLERS = {
+    "greedy": GreedyController,
+    "fixed": FixedTimeController,
+    "hysteresis": HysteresisController,
+    "max_pressure": MaxPressureController,
+    "predictive": PredictiveController,
+}
+
+
+def make_controller(name="hysteresis", preemption=True, clearance=2.0, hold=1.0, **params):
+    """Build a controller by name; `params` go to its constructor (see PARAMS)."""
+    if name not in CONTROLLERS:
+        raise ValueError(f"Unknown controller '{name}' (choose from {', '.join(CONTROLLERS)})")
+    cls = CONTROLLERS[name]
+    unknown = set(params) - set(cls.PARAMS)
+    if unknown:
+        raise ValueError(f"Controller '{name}' does not take {', '.join(sorted(unknown))}")
+
+    controller = cls(**params)
+    if preemption:
+        controller = EmergencyPreemption(controller, clearance, hold)
+    return controller
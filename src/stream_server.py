@@ -0,0 +1,283 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+
+# Ensure src modules import correctly when run as a script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.detection import LABEL_CODES, TrafficDetector
+from src.pipeline import DetectionPipeline
+from src.roi import DEFAULT_ROI
+from src.signal_logic import CONTROLLERS, congestion_level, make_controller
+from src.tracking import VehicleTracker
+from src.websocket import OP_BINARY, WebSocketConnection, encode_frame, is_upgrade, read_request, upgrade
+
+BOUNDARY = "smarttrafficframe"
+# Full metrics snapshot every N frames, so clients that dropped deltas resync
+SNAPSHOT_EVERY = 100
+
+INDEX_HTML = """<!doctype html>
+<html><head><title>Smart Traffic AI</title>
+<style>body{background:#111;color:#eee;font-family:sans-serif;text-align:center}
+img{max-width:95vw}pre{display:inline-block;text-align:left}</style></head>
+<body><h2>🚦 Smart Traffic AI</h2><img src="/stream.mjpg"><pre id="m"></pre>
+<script>
+const state = {};
+const ws = new WebSocket(`ws://${location.host}/ws?frames=0`);
+ws.onmessage = (e) => { Object.assign(state, JSON.parse(e.data));
+  document.getElementById("m").textContent = JSON.stringify(state, null, 1); };
+</script></body></html>
+"""
+
+
+# ------------------------------------------------
+# VIEWERS: one newest-frame slot + a short metrics queue each
+# ------------------------------------------------
+class _Viewer(WebSocketConnection):
+    """
+    A WebSocket client with its own queueing policy. Frames are "latest
+    wins": a slow viewer simply skips frames. Metric deltas queue up to a
+    limit; on overflow the queue is replaced by a single full snapshot so
+    the client's state stays correct.
+    """
+
+    def __init__(self, reader, writer, frames=True, max_messages=32):
+        super().__init__(reader, writer)
+        self.frames = frames
+        self.max_messages = max_messages
+        self.frame = None
+        self.messages = collections.deque()
+        self.skipped = 0
+
+    def push_frame(self, jpeg):
+        if self.frame is not None:
+            self.skipped += 1
+        self.frame = jpeg
+        self._ready.set()
+
+    def push_message(self, text, snapshot_text):
+        if len(self.messages) >= self.max_messages:
+            self.messages.clear()
+            text = snapshot_text
+        self.messages.append(text)
+        self._ready.set()
+
+    def _drain(self):
+        frames = [encode_frame(text) for text in self.messages]
+        self.messages.clear()
+        if self.frame is not None:
+            frames.append(encode_frame(self.frame, OP_BINARY))
+            self.frame = None
+        return frames
+
+
+# ------------------------------------------------
+# SERVER
+# ------------------------------------------------
+class StreamServer:
+    """
+    Detection runs on DetectionPipeline's threads; this class turns each
+    result into one JPEG and one metrics delta and fans both out from an
+    asyncio loop over HTTP (MJPEG, snapshots, JSON) and WebSocket.
+
+    Routes: /  /stream.mjpg  /snapshot.jpg  /metrics.json  /ws[?frames=0]
+    """
+
+    def __init__(self, source, host="0.0.0.0", port=8080, jpeg_quality=80, roi_only=True,
+                 controller="hysteresis"):
+        self.source = source
+        self.host = host
+        self.port = port
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.detector = TrafficDetector(roi=DEFAULT_ROI if roi_only else None)
+        self.controller = make_controller(controller)
+        self.tracker = None
+
+        self.loop = None
+        self.viewers = set()
+        self.jpeg = None
+        self.state = {}
+        self.frames_encoded = 0
+        self._new_frame = None
+        self._stopped = threading.Event()
+
+    # --- PRODUCER (pipeline consumer thread) ---
+    def _analyze(self, result):
+        detections, img = result.detections, result.image
+        h, w, _ = img.shape
+        count_h, count_v = DEFAULT_ROI.count_lanes(detections, w, h)
+        if self.tracker is None:
+            self.tracker = VehicleTracker(roi=DEFAULT_ROI, frame_size=(w, h))
+        self.tracker.update(detections, result.captured_at)
+        flow = self.tracker.flow_rates()
+        queues = self.tracker.queue_lengths()
+        queue_h, queue_v = queues["right"] + queues["left"], queues["down"] + queues["up"]
+        amb_detected = bool((detections["label"] == LABEL_CODES["ambulance"]).any())
+        signal = self.controller.update(count_h, count_v, amb_detected, result.captured_at, (queue_h, queue_v))
+        return {
+            "frame": result.frame_index,
+            "count_h": count_h, "count_v": count_v, "detections": len(detections),
+            "ambulance": amb_detected, "signal": signal,
+            "congestion": congestion_level(count_h + count_v),
+            "flow_h": round(flow["right"] + flow["left"], 1), "flow_v": round(flow["down"] + flow["up"], 1),
+            "queue_h": queue_h, "queue_v": queue_v,
+        }
+
+    def _produce(self, pipeline):
+        started = time.monotonic()
+        for n, result in enumerate(pipeline.results(), 1):
+            if self._stopped.is_set():
+                break
+            metrics = self._analyze(result)
+            metrics["fps"] = round(n / max(time.monotonic() - started, 1e-6), 1)
+            # Encoded once here, shared by every viewer
+            ok, buf = cv2.imencode(".jpg", result.image, self.encode_params)
+            if ok:
+                self.loop.call_soon_threadsafe(self._publish, buf.tobytes(), metrics)
+        self._stopped.set()
+
+    # --- FAN-OUT (event loop) ---
+    def _publish(self, jpeg, metrics):
+        self.jpeg = jpeg
+        self.frames_encoded += 1
+        delta = {k: v for k, v in metrics.items() if self.state.get(k) != v}
+        delta["frame"] = metrics["frame"]
+        self.state = metrics
+        self.state["viewers"] = len(self.viewers)
+
+        snapshot = json.dumps(dict(self.state, type="snapshot"))
+        message = snapshot if self.frames_encoded % SNAPSHOT_EVERY == 0 else json.dumps(dict(delta, type="delta"))
+        for viewer in self.viewers:
+            viewer.push_message(message, snapshot)
+            if viewer.frames:
+                viewer.push_frame(jpeg)
+
+        # Wake MJPEG clients waiting for a frame
+        self._new_frame.set()
+        self._new_frame = asyncio.Event()
+
+    # --- HTTP ---
+    async def _handle(self, reader, writer):
+        try:
+            request = await read_request(reader)
+            if request is None:
+                return
+            method, target, headers = request
+            url = urlparse(target)
+            if url.path == "/ws" and is_upgrade(headers):
+                frames = parse_qs(url.query).get("frames", ["1"])[0] != "0"
+                await upgrade(writer, headers)
+                await self._serve_ws(reader, writer, frames)
+            elif url.path == "/stream.mjpg":
+                await self._serve_mjpeg(writer)
+            elif url.path == "/snapshot.jpg" and self.jpeg is not None:
+                await self._respond(writer, "200 OK", "image/jpeg", self.jpeg)
+            elif url.path == "/metrics.json":
+                body = json.dumps(dict(self.state, viewers=len(self.viewers))).encode()
+                await self._respond(writer, "200 OK", "application/json", body)
+            elif url.path == "/":
+                await self._respond(writer, "200 OK", "text/html; charset=utf-8", INDEX_HTML.encode())
+            else:
+                await self._respond(writer, "404 Not Found", "text/plain", b"Not found")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _respond(self, writer, status, ctype, body):
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+            f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _serve_mjpeg(self, writer):
+        writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary={BOUNDARY}\r\n"
+            f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode()
+        )
+        sent = None
+        while not self._stopped.is_set():
+            if self.jpeg is sent:
+                await self._new_frame.wait()
+                continue
+            # Always the newest frame; anything produced while drain() waited is skipped
+            sent = self.jpeg
+            writer.write(
+                f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(sent)}\r\n\r\n".encode()
+                + sent + b"\r\n"
+            )
+            await writer.drain()
+
+    async def _serve_ws(self, reader, writer, frames):
+        viewer = _Viewer(reader, writer, frames)
+        viewer.push_message(json.dumps(dict(self.state, type="snapshot")), None)
+        self.viewers.add(viewer)
+        try:
+            await viewer.run()
+        finally:
+            self.viewers.discard(viewer)
+
+    # --- LIFECYCLE ---
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self._new_frame = asyncio.Event()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+
+        pipeline = DetectionPipeline(self.source, self.detector)
+        if not pipeline.start():
+            server.close()
+            raise RuntimeError(f"Could not open video source: {self.source}")
+        producer = threading.Thread(target=self._produce, args=(pipeline,), daemon=True)
+        producer.start()
+        print(f"📡 Streaming {self.source} on http://{self.host}:{self.port}/")
+
+        try:
+            while not self._stopped.is_set():
+                await asyncio.sleep(0.2)
+        finally:
+            self._stopped.set()
+            self._new_frame.set()
+            for viewer in list(self.viewers):
+                viewer.writer.close()
+            pipeline.stop()
+            server.close()
+            print(f"Stream ended after {self.frames_encoded} frames")
+
+    def run(self):
+        try:
+            asyncio.run(self._main())
+        except KeyboardInterrupt:
+            self._stopped.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve annotated detection video over MJPEG / WebSocket.")
+    parser.add_argument("--source", default=os.path.join(BASE_DIR, "videos", "simulation.mp4"),
+                        help="Video file, stream URL or camera index")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality")
+    parser.add_argument("--controller", choices=list(CONTROLLERS), default="hysteresis")
+    parser.add_argument("--full-frame", action="store_true", help="Detect on the whole frame, not just the roads")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    StreamServer(source, args.host, args.port, args.quality, not args.full_frame, args.controller).run()
+
+
+if __name__ == "__main__":
+    main()
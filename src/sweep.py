@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Ensure src modules import correctly when run as a script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from generate_simulation import TOTAL_FRAMES, run_headless
+from src.signal_logic import CONTROLLERS
+
+# Grid axes: scenario (traffic) parameters, then policy parameters
+SCENARIO_KEYS = ("spawn_rate", "burst_rate", "burst_period")
+POLICY_KEYS = ("decision_interval", "controller", "min_green", "max_green", "margin", "cycle", "horizon", "weight")
+# Keys passed to make_controller rather than to the simulator
+CONTROLLER_PARAMS = ("min_green", "max_green", "margin", "cycle", "split", "horizon", "weight", "step",
+                     "clearance", "preemption")
+# Metrics averaged over seeds in the summary
+SUMMARY_METRICS = ("avg_wait_s", "avg_delay_s", "throughput_per_hour", "mean_queue_h",
+                   "mean_queue_v", "ambulance_delay_s", "signal_switches")
+# Bump when the simulator or its metrics change, so old cached cells are ignored
+CACHE_VERSION = 3
+
+
+# ------------------------------------------------
+# JOBS: one headless run per (configuration, seed)
+# ------------------------------------------------
+def expand_grid(grid):
+    """
+    Cartesian product of {key: [values]} -> list of {key: value} configurations.
+    Policy parameters the chosen controller doesn't take are dropped, and the
+    resulting duplicates removed (fixed-time doesn't multiply by margins).
+    """
+    keys = list(grid)
+    configs, seen = [], set()
+    for values in itertools.product(*(grid[k] for k in keys)):
+        config = dict(zip(keys, values))
+        accepted = CONTROLLERS[config.get("controller", "greedy")].PARAMS + ("clearance", "preemption")
+        config = {k: v for k, v in config.items() if k not in CONTROLLER_PARAMS or k in accepted}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def job_key(params):
+    """Stable hash of a job's parameters (cache file name)."""
+    text = json.dumps(dict(params, cache_version=CACHE_VERSION), sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def run_job(params):
+    """Worker entry point: params = configuration + seed + frames."""
+    params = dict(params)
+    policy = {k: params.pop(k) for k in CONTROLLER_PARAMS if k in params}
+    start = time.perf_counter()
+    result = run_headless(policy=policy, **params)
+    result["wall_seconds"] = time.perf_counter() - start
+    return result
+
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def _load_cached(cache_dir, key):
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        return None  # half-written file from an interrupted run
+
+
+def _store(cache_dir, key, params, result):
+    # Write then rename, so an interrupted sweep never leaves a truncated cell
+    path = _cache_path(cache_dir, key)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"params": params, "result": result}, f)
+    os.replace(tmp, path)
+
+
+# ------------------------------------------------
+# SWEEP RUNNER
+# ------------------------------------------------
+def run_sweep(grid, seeds=5, base_seed=0, frames=TOTAL_FRAMES, cache_dir="results/sweep_cache",
+              processes=None):
+    """
+    Run every grid configuration for `seeds` seeds on a process pool.
+    Seed i is base_seed + i for every configuration, so configurations are
+    compared on the same traffic. Finished cells are cached by parameter hash
+    and skipped on re-runs. Returns [(config, [per-seed results])].
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    configs = expand_grid(grid)
+
+    cells = []  # (config index, key, params)
+    for ci, config in enumerate(configs):
+        for s in range(seeds):
+            params = dict(config, seed=base_seed + s, frames=frames)
+            cells.append((ci, job_key(params), params))
+
+    results = {}
+    pending = []
+    for ci, key, params in cells:
+        cached = _load_cached(cache_dir, key)
+        if cached is not None:
+            results[key] = cached["result"]
+        else:
+            pending.append((key, params))
+
+    print(f"{len(configs)} configurations x {seeds} seeds = {len(cells)} runs "
+          f"({len(cells) - len(pending)} cached, {len(pending)} to run)")
+
+    if pending:
+        if processes is None:
+            processes = min(len(pending), os.cpu_count() or 1)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {pool.submit(run_job, params): (key, params) for key, params in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                key, params = futures[future]
+                results[key] = future.result()
+                _store(cache_dir, key, params, results[key])
+                if done % 50 == 0 or done == len(pending):
+                    print(f"  {done}/{len(pending)} runs ({time.perf_counter() - start:.1f}s)")
+
+    grouped = [(config, []) for config in configs]
+    for ci, key, _ in cells:
+        grouped[ci][1].append(results[key])
+    return grouped
+
+
+def summarize(grouped):
+    """One row per configuration: parameters + seed-averaged metrics."""
+    rows = []
+    for config, runs in grouped:
+        row = dict(config)
+        for metric in SUMMARY_METRICS:
+            # NaN marks a run without the thing measured (no ambulance seen): leave it out
+            values = [r[metric] for r in runs if not np.isnan(r[metric])]
+            row[metric] = float(np.mean(values)) if values else float("nan")
+        row["ambulance_runs"] = sum(1 for r in runs if r["ambulances"] > 0)
+        row["runs"] = len(runs)
+        row["avg_wait_s_std"] = float(np.std([r["avg_wait_s"] for r in runs]))
+        rows.append(row)
+    rows.sort(key=lambda r: r["avg_wait_s"])
+    return rows
+
+
+def format_table(rows):
+    keys = [k for k in SCENARIO_KEYS + POLICY_KEYS if any(k in r for r in rows)]
+    header = "".join(f"{k:>18}" for k in keys) + f"{'wait s':>10}{'+/-':>8}{'delay s':>10}{'veh/h':>10}{'amb s':>8}{'amb runs':>10}{'switches':>10}"
+    lines = [header]
+    for r in rows:
+        lines.append(
+            "".join(f"{r.get(k, '-'):>18}" for k in keys)
+            + f"{r['avg_wait_s']:>10.2f}{r['avg_wait_s_std']:>8.2f}{r['avg_delay_s']:>10.2f}"
+            + f"{r['throughput_per_hour']:>10.0f}{r['ambulance_delay_s']:>8.2f}"
+            + f"{str(r['ambulance_runs']) + '/' + str(r['runs']):>10}{r['signal_switches']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_list(cast):
+    return lambda text: [cast(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep signal policies over simulated traffic scenarios.")
+    parser.add_argument("--spawn-rate", type=parse_list(float), default=[0.1, 0.15, 0.2])
+    parser.add_argument("--burst-rate", type=parse_list(float), default=[0.3])
+    parser.add_argument("--burst-period", type=parse_list(int), default=[300])
+    parser.add_argument("--decision-interval", type=parse_list(int), default=[1, 10, 30],
+                        help="Frames between signal decisions")
+    parser.add_argument("--controller", type=parse_list(str), default=list(CONTROLLERS),
+                        help="Signal controllers to compare (see signal_logic.CONTROLLERS)")
+    parser.add_argument("--min-green", type=parse_list(float), default=[3.0, 6.0],
+                        help="Seconds a phase is held before it may switch")
+    parser.add_argument("--max-green", type=parse_list(float), default=[40.0])
+    parser.add_argument("--margin", type=parse_list(int), default=[0, 2],
+                        help="Vehicles the other axis must lead by before switching")
+    parser.add_argument("--cycle", type=parse_list(float), default=[20.0, 40.0],
+                        help="Fixed-time cycle length in seconds")
+    parser.add_argument("--horizon", type=parse_list(float), default=[30.0],
+                        help="Seconds ahead the predictive controller forecasts")
+    parser.add_argument("--weight", type=parse_list(float), default=[0.5],
+                        help="Share of forecast (vs current) demand in predictive decisions")
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--base-seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=TOTAL_FRAMES)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--cache", default="results/sweep_cache", help="Directory of cached per-run results")
+    parser.add_argument("--output", help="Write the summary rows here as JSON")
+    args = parser.parse_args()
+
+    grid = {
+        "spawn_rate": args.spawn_rate, "burst_rate": args.burst_rate, "burst_period": args.burst_period,
+        "decision_interval": args.decision_interval, "controller": args.controller,
+        "min_green": args.min_green, "max_green": args.max_green, "margin": args.margin, "cycle": args.cycle,
+        "horizon": args.horizon, "weight": args.weight,
+    }
+    grouped = run_sweep(grid, args.seeds, args.base_seed, args.frames, args.cache, args.processes)
+    rows = summarize(grouped)
+    print(format_table(rows))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"📄 Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
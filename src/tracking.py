@@ -0,0 +1,231 @@
+import collections
+
+import numpy as np
+
+from src.detection import REFERENCE_SIZE
+from src.roi import DEFAULT_ROI
+
+# Approaches are named by direction of travel, like the simulator's vehicles
+APPROACHES = ("right", "left", "down", "up")
+
+TRACK_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("x", np.float32), ("y", np.float32), ("w", np.float32), ("h", np.float32),
+    ("vx", np.float32), ("vy", np.float32), ("speed", np.float32),
+    ("age", np.int32), ("missed", np.int32),
+])
+
+
+# ------------------------------------------------
+# VECTORIZED HELPERS
+# ------------------------------------------------
+def iou_matrix(a, b):
+    """IoU between every box in a (N x 4, x/y/w/h) and b (M x 4)."""
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def greedy_match(score, min_score):
+    """
+    Greedy one-to-one matching on a score matrix (higher is better).
+    Each round accepts every pair that is the other's best choice, so the
+    work stays in NumPy; it converges in a handful of rounds in practice.
+    Returns (rows, cols) of the accepted pairs.
+    """
+    score = np.where(score >= min_score, score, -np.inf)
+    rows_out, cols_out = [], []
+
+    while score.size and np.isfinite(score).any():
+        best_col = score.argmax(axis=1)
+        best_row = score.argmax(axis=0)
+        rows = np.arange(score.shape[0])
+        mutual = (best_row[best_col] == rows) & np.isfinite(score[rows, best_col])
+        if not mutual.any():
+            break
+
+        r, c = rows[mutual], best_col[mutual]
+        rows_out.append(r)
+        cols_out.append(c)
+        score[r, :] = -np.inf
+        score[:, c] = -np.inf
+
+    if not rows_out:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    return np.concatenate(rows_out), np.concatenate(cols_out)
+
+
+# ------------------------------------------------
+# TRACKER: stable IDs, line crossings, flow, queues
+# ------------------------------------------------
+class VehicleTracker:
+    """
+    IoU / centroid tracker over detection arrays (see detection.DETECTION_DTYPE).
+    Track state is kept as parallel NumPy arrays so every step is vectorized.
+
+    Crossings are counted when a track's centroid passes the ROI stop line of
+    its approach (the edge of the junction box) in the direction of travel.
+    """
+
+    def __init__(self, roi=DEFAULT_ROI, frame_size=REFERENCE_SIZE, fps=30.0,
+                 iou_threshold=0.2, max_distance=60.0, max_missed=5,
+                 flow_window=60.0, queue_speed=15.0, smoothing=0.5):
+        self.roi = roi
+        self.frame_size = frame_size
+        self.fps = fps
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.flow_window = flow_window
+        self.queue_speed = queue_speed
+        self.smoothing = smoothing
+
+        self._tracks = np.empty(0, dtype=TRACK_DTYPE)
+        self._next_id = 1
+        self._frame = 0
+        self._start = None
+        self._time = 0.0
+        self._last_detections = None
+
+        self.crossings = {a: 0 for a in APPROACHES}
+        self._crossing_times = {a: collections.deque() for a in APPROACHES}
+
+    @property
+    def tracks(self):
+        """Confirmed, currently visible tracks."""
+        t = self._tracks
+        return t[(t["missed"] == 0) & (t["age"] >= 2)]
+
+    def update(self, detections, timestamp=None):
+        """
+        Associate one frame of detections. Returns the visible tracks.
+        The very array passed last time (AdaptiveDetector between
+        extractions) is a repeat, not a new observation, and is skipped so
+        it can't read as zero motion.
+        """
+        if detections is self._last_detections:
+            return self.tracks
+        self._last_detections = detections
+        self._frame += 1
+        now = timestamp if timestamp is not None else self._frame / self.fps
+        if self._start is None:
+            # Timestamps may be absolute (time.monotonic()); elapsed time counts from here
+            self._start = self._time = now
+        dt = max(now - self._time, 1e-6)
+        self._time = now
+
+        boxes = np.stack(
+            [detections["x"], detections["y"], detections["w"], detections["h"]], axis=1
+        ).astype(np.float32) if len(detections) else np.empty((0, 4), dtype=np.float32)
+
+        tracks = self._tracks
+        # Predict where tracks are now from their velocity
+        predicted = np.stack([
+            tracks["x"] + tracks["vx"] * dt, tracks["y"] + tracks["vy"] * dt,
+            tracks["w"], tracks["h"],
+        ], axis=1) if len(tracks) else np.empty((0, 4), dtype=np.float32)
+
+        # 1) IoU pass
+        rows, cols = greedy_match(iou_matrix(predicted, boxes), self.iou_threshold)
+
+        # 2) Centroid-distance pass for whatever is left (small / fast objects)
+        free_t = np.setdiff1d(np.arange(len(tracks)), rows)
+        free_d = np.setdiff1d(np.arange(len(boxes)), cols)
+        if len(free_t) and len(free_d):
+            pc = predicted[free_t, :2] + predicted[free_t, 2:] / 2
+            dc = boxes[free_d, :2] + boxes[free_d, 2:] / 2
+            dist = np.linalg.norm(pc[:, None, :] - dc[None, :, :], axis=2)
+            r2, c2 = greedy_match(-dist, -self.max_distance)
+            rows = np.concatenate([rows, free_t[r2]])
+            cols = np.concatenate([cols, free_d[c2]])
+
+        # 3) Update matched tracks
+        old_c = np.stack([tracks["x"] + tracks["w"] / 2, tracks["y"] + tracks["h"] / 2], axis=1)
+        if len(rows):
+            m = tracks[rows]
+            new = boxes[cols]
+            vx = (new[:, 0] + new[:, 2] / 2 - (m["x"] + m["w"] / 2)) / dt
+            vy = (new[:, 1] + new[:, 3] / 2 - (m["y"] + m["h"] / 2)) / dt
+            a = self.smoothing
+            m["vx"] = np.where(m["age"] > 1, a * m["vx"] + (1 - a) * vx, vx)
+            m["vy"] = np.where(m["age"] > 1, a * m["vy"] + (1 - a) * vy, vy)
+            m["speed"] = np.hypot(m["vx"], m["vy"])
+            m["x"], m["y"], m["w"], m["h"] = new[:, 0], new[:, 1], new[:, 2], new[:, 3]
+            m["age"] += 1
+            m["missed"] = 0
+            tracks[rows] = m
+
+            new_c = np.stack([m["x"] + m["w"] / 2, m["y"] + m["h"] / 2], axis=1)
+            self._count_crossings(old_c[rows], new_c)
+
+        # 4) Age out unmatched tracks, spawn new ones
+        unmatched = np.ones(len(tracks), dtype=bool)
+        unmatched[rows] = False
+        tracks["missed"][unmatched] += 1
+        tracks = tracks[tracks["missed"] <= self.max_missed]
+
+        new_d = np.setdiff1d(np.arange(len(boxes)), cols)
+        born = np.zeros(len(new_d), dtype=TRACK_DTYPE)
+        born["id"] = np.arange(self._next_id, self._next_id + len(new_d))
+        self._next_id += len(new_d)
+        born["x"], born["y"] = boxes[new_d, 0], boxes[new_d, 1]
+        born["w"], born["h"] = boxes[new_d, 2], boxes[new_d, 3]
+        born["age"] = 1
+
+        self._tracks = np.concatenate([tracks, born])
+        self._expire_crossings()
+        return self.tracks
+
+    def _count_crossings(self, old_c, new_c):
+        y1, y2, x1, x2 = self.roi.bands(*self.frame_size)
+        ox, oy = old_c[:, 0], old_c[:, 1]
+        nx, ny = new_c[:, 0], new_c[:, 1]
+        in_h = (ny > y1) & (ny < y2)
+        in_v = (nx > x1) & (nx < x2)
+
+        crossed = {
+            "right": in_h & (ox < x1) & (nx >= x1),
+            "left": in_h & (ox > x2) & (nx <= x2),
+            "down": in_v & (oy < y1) & (ny >= y1),
+            "up": in_v & (oy > y2) & (ny <= y2),
+        }
+        for approach, mask in crossed.items():
+            n = int(mask.sum())
+            if n:
+                self.crossings[approach] += n
+                self._crossing_times[approach].extend([self._time] * n)
+
+    def _expire_crossings(self):
+        horizon = self._time - self.flow_window
+        for times in self._crossing_times.values():
+            while times and times[0] < horizon:
+                times.popleft()
+
+    def flow_rates(self):
+        """Vehicles per minute entering the junction per approach (sliding window)."""
+        elapsed = 0.0 if self._start is None else self._time - self._start
+        window = min(self.flow_window, max(elapsed, 1e-6))
+        return {a: len(t) * 60.0 / window for a, t in self._crossing_times.items()}
+
+    def queue_lengths(self):
+        """Slow / stopped tracks waiting on each approach arm."""
+        t = self.tracks
+        y1, y2, x1, x2 = self.roi.bands(*self.frame_size)
+        cx, cy = t["x"] + t["w"] / 2, t["y"] + t["h"] / 2
+        slow = t["speed"] < self.queue_speed
+        in_h = (cy > y1) & (cy < y2)
+        in_v = (cx > x1) & (cx < x2)
+        return {
+            "right": int((slow & in_h & (cx < x1)).sum()),
+            "left": int((slow & in_h & (cx > x2)).sum()),
+            "down": int((slow & in_v & (cy < y1)).sum()),
+            "up": int((slow & in_v & (cy > y2)).sum()),
+        }
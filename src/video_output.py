@@ -0,0 +1,223 @@
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+# ------------------------------------------------
+# SINKS: where encoded frames end up
+# ------------------------------------------------
+class CvSink:
+    """cv2.VideoWriter (mp4v by default)."""
+
+    def __init__(self, path, fps, size, codec="mp4v"):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if not self.writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {path}")
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def close(self):
+        self.writer.release()
+
+
+def ffmpeg_command(path, fps, size, codec="libx264", preset="veryfast", crf=23):
+    """ffmpeg reading raw BGR frames from stdin."""
+    w, h = size
+    return [
+        "ffmpeg", "-loglevel", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+        "-c:v", codec, "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p", path,
+    ]
+
+
+class PipeSink:
+    """Raw BGR frames written to an external encoder's stdin."""
+
+    def __init__(self, command):
+        if shutil.which(command[0]) is None:
+            raise RuntimeError(f"Encoder '{command[0]}' not found on PATH")
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(np.ascontiguousarray(frame).data)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"Encoder exited with status {self.process.returncode}")
+
+
+# ------------------------------------------------
+# ASYNC WRITER: encoding off the render thread
+# ------------------------------------------------
+class AsyncVideoWriter:
+    """
+    Hands frames to a sink on a background thread through a bounded queue.
+    write() copies the frame (callers may reuse their buffer) and blocks
+    only when the queue is full, so every frame is kept. Encoder errors
+    surface on the next write() or on close().
+    """
+
+    def __init__(self, sink, queue_size=32):
+        self.sink = sink
+        self.frames = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            if self._error is None:
+                try:
+                    self.sink.write(frame)
+                except Exception as e:
+                    self._error = e
+
+    def write(self, frame, copy=True):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame.copy() if copy else frame)
+        self.frames += 1
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self.sink.close()
+        if self._error is not None:
+            raise self._error
+
+    # cv2.VideoWriter-compatible name
+    release = close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(path, fps, size, encoder="cv2", queue_size=32, **options):
+    """
+    Async writer for `path`.
+    encoder: "cv2" (VideoWriter, options: codec) or "ffmpeg" (pipe, options:
+    codec / preset / crf, or `command` for any other encoder reading raw BGR).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if encoder == "cv2":
+        sink = CvSink(path, fps, size, **options)
+    elif encoder == "ffmpeg":
+        command = options.pop("command", None) or ffmpeg_command(path, fps, size, **options)
+        sink = PipeSink(command)
+    else:
+        raise ValueError(f"Unknown encoder '{encoder}'")
+    return AsyncVideoWriter(sink, queue_size)
+
+
+# ------------------------------------------------
+# INCIDENT CLIPS: pre-roll + post-roll around flagged frames
+# ------------------------------------------------
+class IncidentRecorder:
+    """
+    Keeps the last `pre_seconds` of frames (e.g. detect_traffic's annotated
+    output) in a preallocated ring. When a frame is flagged, a clip starts
+    with that pre-roll and runs until `post_seconds` after the last flagged
+    frame. Memory is pre_seconds * fps frames at the frame size.
+
+    Pass each frame's capture `timestamp` when only some source frames reach
+    the recorder (e.g. the newest-frame pipeline): pre-roll and post-roll are
+    then measured in seconds and clips are written at the rate frames
+    actually arrived, so they play back in real time.
+    """
+
+    def __init__(self, directory, fps=30.0, pre_seconds=2.0, post_seconds=3.0, encoder="cv2",
+                 prefix="incident"):
+        self.directory = directory
+        self.fps = fps
+        self.pre_frames = max(1, int(pre_seconds * fps))
+        self.post_frames = int(post_seconds * fps)
+        self.encoder = encoder
+        self.prefix = prefix
+        self.clips = []
+
+        self._ring = None
+        self._head = 0
+        self._filled = 0
+        self._writer = None
+        self._remaining = 0
+
+        # With timestamps: capture time per ring slot, smoothed frame interval, end of post-roll
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self._times = np.zeros(self.pre_frames)
+        self._last_time = None
+        self._interval = None
+        self._until = None
+
+    def add(self, frame, incident=False, timestamp=None):
+        """Feed one frame (optionally with its capture time in seconds); returns True while recording."""
+        if self._ring is None or self._ring.shape[1:] != frame.shape:
+            self._ring = np.empty((self.pre_frames,) + frame.shape, dtype=frame.dtype)
+            self._head = self._filled = 0
+        if timestamp is not None:
+            self._observe(timestamp)
+
+        if incident:
+            if self._writer is None:
+                self._start(frame.shape[1], frame.shape[0], timestamp)
+            self._remaining = self.post_frames
+            self._until = None if timestamp is None else timestamp + self.post_seconds
+
+        if self._writer is not None:
+            self._writer.write(frame)
+            if not incident:
+                self._remaining -= 1
+                done = self._remaining <= 0 if self._until is None else timestamp >= self._until
+                if done:
+                    self._stop()
+        else:
+            np.copyto(self._ring[self._head], frame)
+            self._times[self._head] = 0.0 if timestamp is None else timestamp
+            self._head = (self._head + 1) % self.pre_frames
+            self._filled = min(self._filled + 1, self.pre_frames)
+        return self._writer is not None
+
+    def _observe(self, timestamp):
+        if self._last_time is not None and timestamp > self._last_time:
+            dt = timestamp - self._last_time
+            self._interval = dt if self._interval is None else 0.9 * self._interval + 0.1 * dt
+        self._last_time = timestamp
+
+    def _start(self, w, h, timestamp=None):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{len(self.clips)}.mp4")
+        # Write at the rate frames reach us, not the source rate, or dropped frames speed the clip up
+        fps = self.fps if self._interval is None else min(self.fps, 1.0 / self._interval)
+        self._writer = open_writer(path, fps, (w, h), self.encoder)
+        self.clips.append(path)
+
+        # Oldest pre-roll frame first; ring slots are reused, so copy them out
+        start = (self._head - self._filled) % self.pre_frames
+        for i in range(self._filled):
+            slot = (start + i) % self.pre_frames
+            if timestamp is None or timestamp - self._times[slot] <= self.pre_seconds:
+                self._writer.write(self._ring[slot])
+        self._filled = 0
+
+    def _stop(self):
+        self._writer.close()
+        self._writer = None
+
+    def close(self):
+        if self._writer is not None:
+            self._stop()
@@ -1,36 +1,239 @@
+import hashlib
+import heapq
+import itertools
 import os
-import playsound
-import pyttsx3
 import threading
+import time
 
-# Initialize engine once
 try:
-    engine = pyttsx3.init()
-except:
-    engine = None
+    import playsound
+except ImportError:
+    playsound = None
 
-def play_alert(audio_path):
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(BASE_DIR, "alerts", "cache")
+
+# Lower value = spoken first
+PRIORITY_EMERGENCY = 0
+PRIORITY_ROUTINE = 10
+
+# Fixed dashboard phrases, synthesised once into CACHE_DIR
+PHRASES = (
+    "Emergency vehicle detected. Priority given to ambulance lane.",
+    "Emergency vehicle passed. Reverting to normal traffic flow.",
+    "Volume increased in Horizontal lane. Switching priority.",
+    "Volume increased in Vertical lane. Switching priority.",
+)
+
+
+def play_alert(audio_path, block=False):
     try:
-        if os.path.exists(audio_path):
-            playsound.playsound(audio_path, block=False)
-    except:
+        if playsound is not None and os.path.exists(audio_path):
+            playsound.playsound(audio_path, block=block)
+    except Exception:
+        pass
+
+
+# ------------------------------------------------
+# BACKENDS: what "speaking" means
+# ------------------------------------------------
+class Pyttsx3Backend:
+    """
+    One pyttsx3 engine, created and used only on the worker thread
+    (pyttsx3 engines are not thread-safe). Cached phrases play from file.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.engine = None
+
+    def _engine(self):
+        if self.engine is None:
+            self.engine = pyttsx3.init()
+        return self.engine
+
+    def cache_path(self, text):
+        return os.path.join(self.cache_dir, hashlib.sha1(text.encode()).hexdigest()[:16] + ".wav")
+
+    def render(self, text):
+        """Pre-synthesise `text` to the cache (skipped if already there)."""
+        path = self.cache_path(text)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            engine = self._engine()
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+
+    def speak(self, text):
+        path = self.cache_path(text)
+        if playsound is not None and os.path.exists(path):
+            play_alert(path, block=True)
+            return
+        engine = self._engine()
+        engine.say(text)
+        engine.runAndWait()
+
+
+class FileBackend:
+    """Appends one line per alert to a text file (headless runs and tests)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def render(self, text):
+        pass
+
+    def speak(self, text):
+        with open(self.path, "a") as f:
+            f.write(f"{time.time():.3f}\t{text}\n")
+
+
+class NullBackend:
+    """Keeps spoken alerts in memory only."""
+
+    def __init__(self):
+        self.spoken = []
+
+    def render(self, text):
         pass
 
-def speak_text(text):
+    def speak(self, text):
+        self.spoken.append(text)
+
+
+def default_backend():
+    """SMART_TRAFFIC_TTS=null | file:<path> | pyttsx3 (default when installed)."""
+    choice = os.environ.get("SMART_TRAFFIC_TTS", "pyttsx3")
+    if choice.startswith("file:"):
+        return FileBackend(choice[5:])
+    if choice == "null" or pyttsx3 is None:
+        return NullBackend()
+    return Pyttsx3Backend()
+
+
+# ------------------------------------------------
+# ALERT SERVICE: one worker, bounded priority queue, dedup
+# ------------------------------------------------
+class AlertService:
+    """
+    say() only enqueues, so callers never wait on speech synthesis.
+    A single worker speaks the most urgent alert first; a phrase that is
+    already queued, or was spoken within `repeat_window` seconds, is
+    dropped. When the queue is full the least urgent alert is discarded,
+    and routine alerts older than `max_age` seconds are skipped as stale.
+    """
+
+    def __init__(self, backend=None, maxsize=8, repeat_window=5.0, max_age=10.0, phrases=PHRASES):
+        self.backend = backend if backend is not None else default_backend()
+        self.maxsize = maxsize
+        self.repeat_window = repeat_window
+        self.max_age = max_age
+        self.dropped = 0
+
+        self._heap = []  # (priority, seq, queued_at, text)
+        self._queued = set()
+        self._last_spoken = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, args=(tuple(phrases),), daemon=True)
+        self._thread.start()
+
+    def say(self, text, priority=PRIORITY_ROUTINE):
+        """Queue an alert; returns False if it was coalesced or dropped."""
+        now = time.monotonic()
+        with self._cond:
+            if self._closed or text in self._queued:
+                return False
+            last = self._last_spoken.get(text)
+            if last is not None and now - last < self.repeat_window:
+                return False
+
+            item = (priority, next(self._seq), now, text)
+            if len(self._heap) >= self.maxsize:
+                worst = max(self._heap)
+                if item > worst:
+                    self.dropped += 1
+                    return False
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                self._queued.discard(worst[3])
+                self.dropped += 1
+
+            heapq.heappush(self._heap, item)
+            self._queued.add(text)
+            self._cond.notify()
+            return True
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _next(self):
+        with self._cond:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if not self._heap:
+                return None
+            priority, _, queued_at, text = heapq.heappop(self._heap)
+            self._queued.discard(text)
+            if priority > PRIORITY_EMERGENCY and time.monotonic() - queued_at > self.max_age:
+                self.dropped += 1
+                return ""
+            self._last_spoken[text] = time.monotonic()
+            return text
+
+    def _run(self, phrases):
+        # Warm the engine and phrase cache up front, off the caller's thread
+        for text in phrases:
+            try:
+                self.backend.render(text)
+            except Exception as e:
+                print(f"TTS Error: {e}")
+                break
+
+        while True:
+            text = self._next()
+            if text is None:
+                return
+            if not text:
+                continue
+            try:
+                self.backend.speak(text)
+            except Exception as e:
+                print(f"TTS Error: {e}")
+
+    def close(self, drain=True):
+        """Stop the worker (after speaking what is queued, if `drain`)."""
+        with self._cond:
+            if not drain:
+                self._heap.clear()
+                self._queued.clear()
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """Process-wide alert service (started on first use)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AlertService()
+        return _service
+
+
+def speak_text(text, priority=PRIORITY_ROUTINE):
     """
-    Speak text using pyttsx3 in a separate thread to avoid blocking.
+    Queue `text` on the shared alert service and return immediately.
     """
-    def _speak():
-        try:
-            # Re-init might be needed if engine is not thread safe, 
-            # but usually one global instance is okay if locked.
-            # For simplicity in Streamlit, we create a new engine instance per call 
-            # or just try-except.
-            local_engine = pyttsx3.init()
-            local_engine.say(text)
-            local_engine.runAndWait()
-        except Exception as e:
-            print(f"TTS Error: {e}")
-
-    thread = threading.Thread(target=_speak)
-    thread.start()
+    return get_service().say(text, priority)
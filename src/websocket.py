@@ -0,0 +1,152 @@
+import asyncio
+import base64
+import collections
+import hashlib
+import struct
+
+# Minimal RFC 6455 server side on asyncio streams (text/binary frames,
+# ping/pong, close) so local clients need no extra dependency.
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_MESSAGE = 1 << 20
+
+
+async def read_request(reader):
+    """Read an HTTP request head -> (method, path, headers) or None on EOF/garbage."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ")
+    if len(parts) < 2:
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    return parts[0], parts[1], headers
+
+
+def is_upgrade(headers):
+    return headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers
+
+
+async def upgrade(writer, headers):
+    """Complete the handshake for a request whose head was already read."""
+    if not is_upgrade(headers):
+        raise ValueError("Not a WebSocket upgrade request")
+    accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + GUID).encode()).digest())
+    writer.write(
+        b"HTTP/1.1 101 Switching Protocols\r\n"
+        b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+        b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+    )
+    await writer.drain()
+
+
+def encode_frame(payload, opcode=None):
+    """Single unmasked (server -> client) frame; str payloads are sent as text."""
+    if isinstance(payload, str):
+        payload = payload.encode()
+        opcode = OP_TEXT if opcode is None else opcode
+    elif opcode is None:
+        opcode = OP_BINARY
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def read_frame(reader):
+    """Read one client frame -> (opcode, payload bytes). Raises on EOF."""
+    b1, b2 = await reader.readexactly(2)
+    opcode = b1 & 0x0F
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > MAX_MESSAGE:
+        raise ValueError("WebSocket frame too large")
+    mask = await reader.readexactly(4) if b2 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+# ------------------------------------------------
+# CONNECTION: per-client bounded send queue
+# ------------------------------------------------
+class WebSocketConnection:
+    """
+    One upgraded client. send() never waits: messages go to a bounded
+    queue and the oldest is dropped when the client can't keep up.
+    run() pumps that queue and answers pings until the client leaves.
+    Subclasses with their own queueing policy override _drain() and set
+    _ready when they have something to send.
+    """
+
+    def __init__(self, reader, writer, queue_size=16):
+        self.reader = reader
+        self.writer = writer
+        self.dropped = 0
+        self.closed = False
+        self._queue = collections.deque(maxlen=queue_size)
+        self._ready = asyncio.Event()
+
+    def send(self, payload, opcode=None):
+        if self.closed:
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(encode_frame(payload, opcode))
+        self._ready.set()
+
+    def _drain(self):
+        """Encoded frames to write now, in order."""
+        frames = list(self._queue)
+        self._queue.clear()
+        return frames
+
+    async def _send_loop(self):
+        try:
+            while not self.closed:
+                await self._ready.wait()
+                self._ready.clear()
+                for data in self._drain():
+                    self.writer.write(data)
+                await self.writer.drain()
+        except ConnectionError:
+            self.closed = True
+
+    async def _receive_loop(self):
+        while True:
+            opcode, payload = await read_frame(self.reader)
+            if opcode == OP_CLOSE:
+                self.writer.write(encode_frame(payload[:2], OP_CLOSE))
+                return
+            if opcode == OP_PING:
+                self.writer.write(encode_frame(payload, OP_PONG))
+
+    async def run(self):
+        sender = asyncio.ensure_future(self._send_loop())
+        try:
+            await self._receive_loop()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.closed = True
+            self._ready.set()
+            sender.cancel()
+            try:
+                self.writer.close()
+            except Exception:
+                pass
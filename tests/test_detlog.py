@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+
+# Ensure src modules import correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.detection import DETECTION_DTYPE
+from src.detlog import HEADER, LOG_DTYPE, NO_OBJECT, DetectionLogReader, DetectionLogWriter
+from src.roi import LANE_H, LANE_V
+
+
+def make_detections(n, start):
+    detections = np.zeros(n, dtype=DETECTION_DTYPE)
+    detections["x"] = np.arange(start, start + n)
+    detections["y"] = 10
+    detections["w"] = detections["h"] = 20
+    detections["area"] = 400.0
+    return detections
+
+
+def test_append_after_truncated_record(tmp_path):
+    path = str(tmp_path / "detections.stlog")
+
+    with DetectionLogWriter(path) as writer:
+        writer.write_frame(0, 100.0, make_detections(2, 0), [LANE_H, LANE_V], "Horizontal")
+        writer.write_frame(1, 101.0, make_detections(0, 0), [], "Vertical")
+
+    # Simulate a crash halfway through writing the next record
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (LOG_DTYPE.itemsize // 2))
+
+    with DetectionLogWriter(path) as writer:
+        writer.write_frame(2, 102.0, make_detections(1, 50), [LANE_V], "Vertical")
+
+    assert os.path.getsize(path) == HEADER.size + 4 * LOG_DTYPE.itemsize
+    records = DetectionLogReader(path).records
+    assert records["frame"].tolist() == [0, 0, 1, 2]
+    assert records["timestamp"].tolist() == [100.0, 100.0, 101.0, 102.0]
+    assert records["x"].tolist() == [0, 1, 0, 50]
+    assert records["label"][2] == NO_OBJECT
+    assert records["lane"].tolist()[3] == LANE_V
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure src modules import correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.events import DROP_NEWEST, DROP_OLDEST, FRAME, SIGNAL_CHANGED, Event, Subscription
+
+
+def make_subscription(policy, maxsize=3):
+    sub = Subscription(sink=None, maxsize=maxsize, policy=policy)
+    sub._ready = asyncio.Event()  # normally created when the bus attaches the subscription
+    return sub
+
+
+def offer_all(sub, types):
+    for seq, event_type in enumerate(types):
+        sub.offer(Event(seq, event_type, float(seq), {}))
+
+
+def queued(sub):
+    return [(e.seq, e.type) for e in sub._queue]
+
+
+@pytest.mark.parametrize("policy", [DROP_OLDEST, DROP_NEWEST])
+def test_state_change_evicts_oldest_frame(policy):
+    sub = make_subscription(policy)
+    offer_all(sub, [FRAME, SIGNAL_CHANGED, FRAME, SIGNAL_CHANGED])
+
+    assert queued(sub) == [(1, SIGNAL_CHANGED), (2, FRAME), (3, SIGNAL_CHANGED)]
+    assert sub.dropped == 1
+
+
+def test_frame_overflow_by_policy():
+    oldest = make_subscription(DROP_OLDEST)
+    offer_all(oldest, [FRAME, FRAME, FRAME, FRAME])
+    assert [seq for seq, _ in queued(oldest)] == [1, 2, 3]
+
+    newest = make_subscription(DROP_NEWEST)
+    offer_all(newest, [FRAME, FRAME, FRAME, FRAME])
+    assert [seq for seq, _ in queued(newest)] == [0, 1, 2]
+    assert oldest.dropped == newest.dropped == 1
+
+
+def test_only_state_changes_queued():
+    oldest = make_subscription(DROP_OLDEST)
+    offer_all(oldest, [SIGNAL_CHANGED] * 3 + [FRAME, SIGNAL_CHANGED])
+    # The frame never displaces a state change; the new state change evicts the oldest one
+    assert [seq for seq, _ in queued(oldest)] == [1, 2, 4]
+    assert oldest.dropped == 2
+
+    newest = make_subscription(DROP_NEWEST)
+    offer_all(newest, [SIGNAL_CHANGED] * 3 + [FRAME, SIGNAL_CHANGED])
+    assert [seq for seq, _ in queued(newest)] == [0, 1, 2]
+    assert newest.dropped == 2
+
+
+def test_type_filter_and_unknown_policy():
+    sub = Subscription(sink=None, types=[SIGNAL_CHANGED])
+    sub._ready = asyncio.Event()
+    offer_all(sub, [FRAME, SIGNAL_CHANGED])
+    assert queued(sub) == [(1, SIGNAL_CHANGED)]
+    assert sub.dropped == 0
+
+    with pytest.raises(ValueError):
+        Subscription(sink=None, policy="drop_random")
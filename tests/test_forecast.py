@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+
+# Ensure src modules import correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.forecast import DemandForecaster, series_index
+
+
+def test_constant_demand_forecasts_the_constant():
+    f = DemandForecaster(n_series=2)
+    for t in range(60):
+        f.update([4.0, 9.0], float(t))
+
+    assert np.allclose(f.forecast(30.0), [4.0, 9.0])
+    assert np.allclose(f.trend, 0.0)
+
+
+def test_ramp_gives_rising_forecast():
+    f = DemandForecaster(n_series=1, alpha=0.5, beta=0.2)
+    for t in range(120):
+        f.update([0.1 * t], float(t))
+
+    assert f.trend[0] > 0.05  # vehicles per second
+    ahead = f.forecast(10.0)[0]
+    assert 0.1 * 119 < ahead < 0.1 * 129
+
+
+def test_irregular_updates_match_regular_ones():
+    # Smoothing is defined per `step`, so skipping updates on a flat series changes nothing
+    regular, sparse = DemandForecaster(n_series=1), DemandForecaster(n_series=1)
+    for t in range(0, 40):
+        regular.update([5.0], float(t))
+    for t in range(0, 40, 4):
+        sparse.update([5.0], float(t))
+    assert np.allclose(regular.forecast(5.0, now=40.0), sparse.forecast(5.0, now=40.0))
+
+
+def test_missing_values_and_index():
+    f = DemandForecaster(n_series=4)
+    f.update([3.0, np.nan], 0.0, index=[series_index(1, "Horizontal"), series_index(1, "Vertical")])
+
+    assert f.level.tolist() == [0.0, 0.0, 3.0, 0.0]
+    assert np.isnan(f.last[[0, 1, 3]]).all()
+    assert f.forecast(60.0, index=2)[0] == 3.0
+
+
+def test_forecast_never_negative():
+    f = DemandForecaster(n_series=1, alpha=0.5, beta=0.5, phi=1.0)
+    for t, x in enumerate([10.0, 6.0, 2.0, 0.0]):
+        f.update([x], float(t))
+    assert f.trend[0] < 0
+    assert f.forecast(60.0)[0] == 0.0
+
+
+def test_learns_time_of_day_profile():
+    f = DemandForecaster(n_series=1, step=60.0, alpha=0.01, season_slots=24)
+    profile = np.where(np.arange(24) < 12, 2.0, 8.0)  # quiet mornings, busy afternoons
+    for minute in range(0, 14 * 24 * 60, 10):
+        t = minute * 60.0
+        f.update([profile[int(t // 3600) % 24]], t)
+
+    day = 14 * 86400.0
+    assert f.forecast(0.0, now=day + 3 * 3600)[0] < 4.0
+    assert f.forecast(0.0, now=day + 15 * 3600)[0] > 6.0
@@ -0,0 +1,72 @@
+import os
+import sys
+
+# Ensure src modules import correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.history import RESOLUTIONS, RollingAggregator
+
+T0 = 1_699_999_200  # a whole hour, in epoch seconds
+SECOND_SLOTS = dict((name, length) for name, _, length in RESOLUTIONS)["second"]
+
+
+def test_second_ring_wraps():
+    history = RollingAggregator()
+    history.add(T0, 2, 1)
+    history.add(T0 + 1, 4, 3)
+    # Same slot as T0 one ring length later: the old bucket is replaced, not merged
+    history.add(T0 + SECOND_SLOTS, 6, 5)
+    history.add(T0 + SECOND_SLOTS + 1, 0, 0)
+
+    assert len(history.query("second", T0, T0 + 1)) == 0
+    rows = history.query("second", T0, T0 + SECOND_SLOTS + 1)
+    assert rows["key"].tolist() == [T0 + 1, T0 + SECOND_SLOTS]
+    assert rows["sum_h"].tolist() == [4.0, 6.0]
+    assert rows["samples"].tolist() == [1, 1]
+
+
+def test_open_second_is_included():
+    history = RollingAggregator()
+    history.add(T0 + 0.2, 2, 1, congestion="High", ambulance=True)
+    history.add(T0 + 0.7, 4, 5, congestion="Low")
+
+    s = history.series("second", T0, T0 + 1)
+    assert s["mean_h"].tolist() == [3.0]
+    assert s["max_v"].tolist() == [5]
+    assert s["high_share"].tolist() == [0.5]
+    assert s["ambulance_frames"].tolist() == [1]
+
+
+def test_old_minutes_fall_back_to_sqlite(tmp_path):
+    db = str(tmp_path / "history.sqlite")
+    history = RollingAggregator(db, flush_interval=1e9)
+    minutes = 24 * 60 + 30  # 30 more than the minute ring holds
+    for m in range(minutes):
+        history.add(T0 + 60 * m, m % 7, 1)
+    history.flush()
+
+    rows = history.query("minute", T0, T0 + 60 * minutes)
+    assert rows["key"].tolist() == [T0 // 60 + m for m in range(minutes)]
+    assert rows["sum_h"].tolist() == [float(m % 7) for m in range(minutes)]
+    history.close()
+
+
+def test_flush_close_open_persists_current_buckets(tmp_path):
+    db = str(tmp_path / "history.sqlite")
+    history = RollingAggregator(db, flush_interval=1e9)
+    history.add(T0 + 5, 2, 1)
+    history.add(T0 + 6, 4, 3)
+    history.flush(close_open=True)
+
+    # A fresh aggregator only sees what reached the database
+    reopened = RollingAggregator(db)
+    minute = reopened.query("minute", T0, T0 + 60)
+    assert minute["samples"].tolist() == [2]
+    assert minute["sum_h"].tolist() == [6.0]
+    hour = reopened.query("hour", T0, T0 + 3600)
+    assert hour["max_v"].tolist() == [3]
+    assert len(reopened.query("second", T0, T0 + 60)) == 0  # seconds are memory only
+    reopened.close()
+    history.close()
@@ -2,6 +2,14 @@ import cv2
 import numpy as np
 import os
 import random
+import sys
+
+# Ensure src modules import correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from src.video_output import open_writer
 
 width, height = 1280, 720
 fps = 30
@@ -39,8 +47,8 @@ def spawn_vehicle():
     return {"type": kind, "color": color, "size": size, "pos": [x, y], "vel": [vx, vy]}
 
 output_path = os.path.join(os.path.dirname(__file__), "traffic.mp4")
-fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-video = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+# Encoding runs on a background thread while the next frame is drawn
+video = open_writer(output_path, fps, (width, height))
 
 for frame in range(total_frames):
     img = np.ones((height, width, 3), dtype=np.uint8) * 255
@@ -59,7 +67,7 @@ for frame in range(total_frames):
         if x < -150 or x > width + 150 or y < -150 or y > height + 150:
             vehicles.remove(v)
 
-    video.write(img)
+    video.write(img, copy=False)
 
 video.release()
 print("🎥 Simulation traffic.mp4 generated successfully!")